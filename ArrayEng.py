@@ -0,0 +1,404 @@
+import Vectors
+import PhysEng
+import Constants
+from Events import *
+from concurrent.futures import ThreadPoolExecutor
+from weakref import ref
+
+# numpy is optional. Without it the game just uses the normal engine (see PhysEng.py)
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# An array backed version of the physics engine
+# Instead of going through every Verlet and Stick one at a time, the positions, old positions and w values of every
+# node in a wireframe are kept in numpy arrays, and the engine moves all of them at once.
+
+# The wireframe keeps working like normal, since its nodes are replaced with VerletViews.
+# A VerletView looks and acts like a Verlet, but reads and writes its values straight from the arrays
+# This means the renderer, the game (holding nodes, pinning nodes) and saving don't need to know about the arrays.
+
+
+# Creates a property that reads and writes one column of the row a view points to
+def coordinate(axis, row='row'):
+    def get(self):
+        return getattr(self, row)[axis]
+
+    def set(self, value):
+        getattr(self, row)[axis] = value
+
+    return property(get, set)
+
+
+# A Vector3d that is stored in one row of an (N, 3) array
+class RowView(Vectors.Vector3d):
+    def __init__(self, array, index):
+        self.row = array[index]
+
+    x = coordinate(0)
+    y = coordinate(1)
+    z = coordinate(2)
+
+    # Saves as a normal vector, so the arrays don't get pickled with it
+    def __reduce__(self):
+        return Vectors.Vector3d, (float(self.x), float(self.y), float(self.z))
+
+
+# A Verlet that is stored in a NodeBuffer
+class VerletView(Vectors.Verlet):
+    def __init__(self, buffer, index):
+        self.buffer = buffer
+        self.index = index
+        self.row = buffer.pos[index]
+        self.oldrow = buffer.old[index]
+
+    x = coordinate(0)
+    y = coordinate(1)
+    z = coordinate(2)
+    ox = coordinate(0, 'oldrow')
+    oy = coordinate(1, 'oldrow')
+    oz = coordinate(2, 'oldrow')
+
+    @property
+    def w(self):
+        return self.buffer.w[self.index]
+
+    @w.setter
+    def w(self, value):
+        self.buffer.w[self.index] = value
+
+    @property
+    def old(self):
+        return RowView(self.buffer.old, self.index)
+
+    @old.setter
+    def old(self, vect):
+        self.buffer.old[self.index] = (vect.x, vect.y, vect.z)
+
+    # Saves (and deepcopies) as a normal Verlet
+    def __reduce__(self):
+        return Vectors.Verlet, (float(self.x), float(self.y), float(self.z), int(self.w), (float(self.ox), float(self.oy), float(self.oz)))
+
+
+# Splits edges into levels, where no two edges in a level share a node.
+# An edge is always put in a later level than every edge before it that shares a node with it,
+# so solving the levels in order gives exactly the same result as solving the edges one at a time in list order.
+def schedule(edges):
+    last = {}   # The last level each node was used in
+    levels = []
+    for i, (first, second) in enumerate(edges):
+        level = max(last.get(first, -1), last.get(second, -1)) + 1
+        last[first] = last[second] = level
+        if level == len(levels):
+            levels.append([])
+        levels[level].append(i)
+    return levels
+
+
+# Stores the data of a wireframe in arrays
+class NodeBuffer:
+    def __init__(self, wireframe):
+        nodes = wireframe.nodes
+
+        # Positions, old positions and w values of every node
+        pos = np.array([[node.x, node.y, node.z] for node in nodes], dtype=float).reshape(-1, 3)
+        old = np.array([[node.ox, node.oy, node.oz] for node in nodes], dtype=float).reshape(-1, 3)
+        w = np.array([node.w for node in nodes], dtype=float)
+
+        # Edges are stored as pairs of node indices, and the ideal length of each edge
+        index = {id(node): i for i, node in enumerate(nodes)}
+        edges = np.array([[index[id(edge.first)], index[id(edge.second)]] for edge in wireframe.edges], dtype=int).reshape(-1, 2)
+        lengths = np.array([edge.length for edge in wireframe.edges], dtype=float)
+
+        self.setup(wireframe, pos, old, w, edges, lengths)
+
+    # Creates a buffer from arrays that already exist, like ones read straight out of a scene file (see Scene.py)
+    @classmethod
+    def from_arrays(cls, wireframe, pos, old, w, edges, lengths):
+        buffer = cls.__new__(cls)
+        buffer.setup(wireframe, pos, old, w, edges, lengths)
+        return buffer
+
+    def setup(self, wireframe, pos, old, w, edges, lengths):
+        self.version = wireframe.version
+        self.pos = pos
+        self.old = old
+        self.w = w
+        self.edges = edges
+        self.lengths = lengths
+
+        # The groups of edges for each solver. They are only worked out when the engine first asks for them,
+        # so a buffer that is only looked at (and not simulated) never has to go through every edge
+        self.wireframe = ref(wireframe)
+        self.solvers = {}
+
+    # Returns the groups of edges that can be solved at once, for a solver.
+    # Either levels that keep the edge order, or colour groups
+    def levels(self, solver='order'):
+        if solver not in self.solvers:
+            if solver == 'colour':
+                groups = self.wireframe().colourEdges()
+            else:
+                groups = schedule(self.edges.tolist())
+
+            # Precomputes the node indices and lengths of each group, so the engine doesn't have to every frame
+            self.solvers[solver] = [(self.edges[group, 0], self.edges[group, 1], self.lengths[group]) for group in map(np.array, groups)]
+        return self.solvers[solver]
+
+    def __len__(self):
+        return len(self.pos)
+
+
+# Moves the data of a wireframe into a NodeBuffer, and replaces its nodes with views of that buffer
+def bind(wireframe):
+    # The nodes are replaced, so anything that remembers them (like the renderer) has to know the wireframe changed
+    wireframe.version += 1
+    buffer = NodeBuffer(wireframe)
+    views = [VerletView(buffer, i) for i in range(len(buffer))]
+
+    # Points the edges and faces to the new views
+    index = {id(node): i for i, node in enumerate(wireframe.nodes)}
+    for edge in wireframe.edges:
+        edge.first = views[index[id(edge.first)]]
+        edge.second = views[index[id(edge.second)]]
+    for face in wireframe.faces:
+        face.first = views[index[id(face.first)]]
+        face.second = views[index[id(face.second)]]
+        face.third = views[index[id(face.third)]]
+
+    wireframe.nodes[:] = views
+    wireframe.buffer = buffer
+    wireframe.lookup = None # The lookups still point to the old nodes
+    return buffer
+
+
+# Binds a wireframe, unless it already has an up to date buffer (like a wireframe loaded with Scene.load(mapped=True))
+def refresh(wireframe):
+    if wireframe.buffer is None or wireframe.buffer.version != wireframe.version:
+        bind(wireframe)
+    return wireframe.buffer
+
+
+# The three steps of the engine, done on arrays.
+# They do exactly the same maths as the methods in PhysEng.Engine, in the same order, so the results match.
+
+# Moves every node. Returns the velocity of every node
+def integrate(pos, old, w, friction, grav):
+    velocity = (pos - old) * friction
+    old[:] = pos
+    pos += (velocity + grav) * w[:, None]
+    return velocity
+
+
+# Moves the nodes of every edge so they are the right distance apart.
+# Returns how far off the worst edge was, as a fraction of its length
+def relax(pos, w, levels):
+    residual = 0
+    for first, second, length in levels:
+        residual = max(residual, relaxLevel(pos, w, first, second, length))
+    return residual
+
+
+# Moves the nodes of one group of edges. No two edges in the group can share a node
+def relaxLevel(pos, w, first, second, length):
+    rel = pos[first] - pos[second]
+    distance = np.sqrt(rel[:, 0] ** 2 + rel[:, 1] ** 2 + rel[:, 2] ** 2)
+    difference = length - distance
+    if not len(difference):
+        return 0
+
+    # Nodes in the same position can't be divided by. They use 0.5 like the normal engine does
+    zero = distance == 0
+    percent = np.where(zero, 0.5, difference / np.where(zero, 1, distance) / 2)
+
+    offset = rel * percent[:, None]
+    pos[first] += offset * w[first, None]
+    pos[second] -= offset * w[second, None]
+
+    # Edges with no length are off by however far apart their nodes are
+    nolength = length == 0
+    error = np.where(nolength, distance, np.abs(difference) / np.where(nolength, 1, length))
+    return float(error.max())
+
+
+# Groups smaller than this are solved on the main thread, as it isn't worth the cost of handing them to the pool
+THREAD_MIN_EDGES = 4096
+
+
+# Puts nodes that are outside the box back inside, and bounces them off the wall.
+# Returns the index and speed of every node that hit a wall
+def clamp(pos, old, box, bounce):
+    velocity = (pos - old) * bounce
+    outside = (pos < 0) | (pos > box)
+    np.clip(pos, 0, box, out=pos)
+    old[outside] = pos[outside] + velocity[outside]
+
+    hit = np.flatnonzero(outside.any(axis=1))
+    return hit, np.sqrt(velocity[hit, 0] ** 2 + velocity[hit, 1] ** 2 + velocity[hit, 2] ** 2)
+
+
+# The islands of a wireframe in a NodeBuffer.
+# The nodes are kept sorted by island, so how far each island moved can be worked out for all of them at once
+class ArrayIslands(PhysEng.Islands):
+    def __init__(self, object):
+        super().__init__(object)
+        # The nodes sorted by island, and where each island starts
+        self.order = np.array([i for island in self.islands for i in island.indices], dtype=int)
+        self.starts = np.cumsum([0] + [len(island.indices) for island in self.islands[:-1]])
+        self.last = None # The positions at the end of the last frame
+
+    # Returns whether every island is asleep
+    def resting(self):
+        return self.asleep == len(self.islands)
+
+    # Returns 1 for every node that is awake and 0 for every node that is asleep
+    def mask(self):
+        if self.awake is None:
+            self.awake = np.ones(len(self.order))
+            for island in self.islands:
+                if island.asleep:
+                    self.awake[island.indices] = 0
+        return self.awake
+
+
+class ArrayEngine(PhysEng.Engine):
+    # The array engine solves a whole group of edges at once, so it uses the colour groups unless told otherwise.
+    # The 'order' solver gives exactly the same results as the normal engine, but it needs so many groups (one after
+    # another, each a separate numpy call) that it ends up slower than the normal engine
+    def __init__(self, objects, friction, box, **kwargs):
+        kwargs.setdefault('solver', Constants.PHY_ARRAY_SOLVER)
+        self.threadpool = None # The threads movesticksThreaded uses. Only started when first needed
+        super().__init__(objects, friction, box, **kwargs)
+
+    # Stops the threads, if they were started. They are started again if the engine is stepped after this
+    def close(self):
+        if self.threadpool is not None:
+            self.threadpool.shutdown()
+            self.threadpool = None
+
+    # Every wireframe given to the engine is bound to a buffer straight away.
+    # That way nodes the game grabs from the wireframes are already the views the engine moves.
+    @property
+    def objects(self):
+        return self.wireframes
+
+    @objects.setter
+    def objects(self, objects):
+        self.wireframes = objects
+        self.forget()
+        for object in objects:
+            refresh(object)
+
+    def additem(self, *objects):
+        super().additem(*objects)
+        for object in objects:
+            refresh(object)
+
+    # Returns the buffer of every object, rebuilding any that are out of date
+    def buffers(self):
+        for object in self.objects:
+            yield refresh(object)
+
+    def snapshot(self):
+        return [buffer.pos.copy() for buffer in self.buffers()]
+
+    def blend(self, alpha):
+        self.current = None
+        if not self.previous or alpha >= 1:
+            return
+        self.current = self.snapshot()
+        for buffer, previous in zip(self.buffers(), self.previous):
+            if previous.shape == buffer.pos.shape:
+                buffer.pos[:] = previous + (buffer.pos - previous) * alpha
+
+    def restore(self):
+        if self.current is None:
+            return
+        for buffer, current in zip(self.buffers(), self.current):
+            buffer.pos[:] = current
+        self.current = None
+
+    def group(self, object):
+        return ArrayIslands(object)
+
+    # Returns the w values of a buffer, with every node of a sleeping island pinned so nothing moves it.
+    # Returns None if every island is asleep, so the buffer can be skipped
+    def weights(self, object, buffer):
+        if not self.asleep:
+            return buffer.w
+        islands = self.islands(object)
+        if not islands.asleep:
+            return buffer.w
+        if islands.resting():
+            return None
+        return buffer.w * islands.mask()
+
+    def settle(self):
+        for object, buffer in zip(self.objects, self.buffers()):
+            islands = self.islands(object)
+            if islands.resting() or not len(buffer):
+                continue
+            last = islands.last
+            islands.last = buffer.pos.copy()
+            if last is None or last.shape != buffer.pos.shape:
+                continue
+
+            # The furthest (squared) any node of each island moved
+            moved = np.maximum.reduceat(((buffer.pos - last) ** 2).sum(axis=1)[islands.order], islands.starts)
+            for island, distance in zip(islands.islands, moved.tolist()):
+                if not island.asleep:
+                    self.rest(islands, island, distance)
+
+    def movepoints(self):
+        grav = np.array(list(self.grav), dtype=float)
+        for object, buffer in zip(self.objects, self.buffers()):
+            w = self.weights(object, buffer)
+            if w is None or not len(buffer):
+                continue
+            velocity = integrate(buffer.pos, buffer.old, w, self.friction, grav)
+
+            # Only the fastest node is kept, as that is all the achievements care about
+            speed = np.sqrt(velocity[:, 0] ** 2 + velocity[:, 1] ** 2 + velocity[:, 2] ** 2)
+            self.frame.speed = max(self.frame.speed, float(speed.max()))
+
+    def movesticks(self):
+        if self.threads > 1:
+            return self.movesticksThreaded()
+
+        residual = 0
+        for object, buffer in zip(self.objects, self.buffers()):
+            w = self.weights(object, buffer)
+            if w is not None:
+                residual = max(residual, relax(buffer.pos, w, buffer.levels(self.solver)))
+        return residual
+
+    # Same as movesticks, but splits big groups of edges between a pool of threads.
+    # Since no two edges in a group share a node, the threads never write to the same node.
+    # numpy lets go of the GIL while it works, so the threads run at the same time
+    def movesticksThreaded(self):
+        if self.threadpool is None:
+            self.threadpool = ThreadPoolExecutor(self.threads)
+
+        residual = 0
+        for object, buffer in zip(self.objects, self.buffers()):
+            w = self.weights(object, buffer)
+            if w is None:
+                continue
+            for first, second, length in buffer.levels(self.solver):
+                if len(length) < THREAD_MIN_EDGES:
+                    residual = max(residual, relaxLevel(buffer.pos, w, first, second, length))
+                    continue
+
+                chunks = zip(*(np.array_split(array, self.threads) for array in (first, second, length)))
+                for job in [self.threadpool.submit(relaxLevel, buffer.pos, w, *chunk) for chunk in chunks]:
+                    residual = max(residual, job.result())
+        return residual
+
+    def constrainPoints(self):
+        box = np.array(list(self.box), dtype=float)
+        for object, buffer in zip(self.objects, self.buffers()):
+            if self.asleep and self.islands(object).resting():
+                continue
+            for index, speed in zip(*clamp(buffer.pos, buffer.old, box, Constants.PHY_BOUNCE)):
+                self.collide(float(speed), object.nodes[index])
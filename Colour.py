@@ -56,6 +56,8 @@ def HSVtoRGB(hsv):
     return Vector3d((prime[0] + m) * 255, (prime[1] + m) * 255, (prime[2] + m) * 255)
 
 class ColourUpdater:
+    events = (TickEvent,)
+
     @EventAdder
     def __init__(self, **kwargs):
         self.layer = -2
@@ -1,20 +1,13 @@
-import pygame
-from Features import *
-from Events import *
 from Vectors import *
 import pickle
 
-# Initialise the pygame and mixer modul
-pygame.mixer.pre_init(44100, -16, 1, 512)
-pygame.init()
+# Importing this file does nothing but define values.
+# The window, sounds and achievement trackers are only created the first time something asks for them
+# (see __getattr__ at the bottom), or when init() is called. This means the physics engine, vectors, wireframes
+# and renderer can be imported without opening a window or loading any sounds.
 
-# Create the screen. Uses a double buffer to prevent tearing
+# The size of the window
 SCREEN_SIZE = (800, 600)
-gameDisplay = pygame.display.set_mode(SCREEN_SIZE, pygame.DOUBLEBUF)
-
-# Creates global variables
-Controller = EventManager()
-globalTimer = Timer(evManager=Controller)
 
 # Create achievement names, and the score required to unlock the achievement
 # The class "Achievements" knows what to do with this
@@ -30,30 +23,6 @@ ACH_IDEALS = {
     'FACER': 40
 }
 
-# Creates the achievement boxes that will display on the achievement screen
-AchievementBoxes = [AchievementBox(60, 250, 150, 100, 'POPPER', False, [0, ACH_IDEALS['POPPER'], 'Ballons popped'], gameDisplay, evManager=Controller),
-                    AchievementBox(220, 250, 150, 100, 'SPEED', False, [0, ACH_IDEALS['SPEED'], 'Maxiumum speed reached'], gameDisplay, evManager=Controller),
-                    AchievementBox(380, 250, 150, 100, 'COLLIDER', False, [0, ACH_IDEALS['COLLIDER'], 'Maxiumum collision speed'], gameDisplay, evManager=Controller),
-                    AchievementBox(60, 400, 150, 100, 'NODER', False, [0, ACH_IDEALS['NODER'], 'Nodes built'], gameDisplay, evManager=Controller),
-                    AchievementBox(220, 400, 150, 100, 'EDGER', False, [0, ACH_IDEALS['EDGER'], 'Edges built'], gameDisplay, evManager=Controller),
-                    AchievementBox(380, 400, 150, 100, 'FACER', False, [0, ACH_IDEALS['FACER'], 'Faces built'], gameDisplay, evManager=Controller)
-                    ]
-
-# Creates the achievement tracker. Keeps track on the progress the player makes
-globalAchievements = Achievements(AchievementBoxes, gameDisplay, evManager=Controller)
-
-# Checks to see if the achievement progress was already saved
-try:
-    # Loads data from the file
-    vars = pickle.load(open('SAVEDATA', 'rb'))
-    globalAchievements.tracker = vars[0]
-    globalAchievements.achievements = vars[1]
-
-    # Update the achievement tracker with the new data
-    globalAchievements.update()
-except:
-    pass
-
 # Defines sound paths (incase it is called through pygame.mixer.music)
 SOUND_FILE_ERROR = 'Sounds/Error.wav'
 SOUND_FILE_BUILD = 'Sounds/Build.wav'
@@ -65,27 +34,33 @@ SOUND_FILE_KEYSTROKE = 'Sounds/Keystroke.wav'
 SOUND_FILE_BACKGROUND = 'Sounds/Background.mp3'
 SOUND_FILE_FIREWORK = 'Sounds/Firework.wav'
 
-# Create pygame.mixer Sound objects, based on previous file paths
-SOUND_ERROR = pygame.mixer.Sound(SOUND_FILE_ERROR)
-SOUND_BUILD = pygame.mixer.Sound(SOUND_FILE_BUILD)
-SOUND_CLEAR = pygame.mixer.Sound(SOUND_FILE_CLEAR)
-SOUND_THUMP = pygame.mixer.Sound(SOUND_FILE_THUMP)
-SOUND_SELECT = pygame.mixer.Sound(SOUND_FILE_SELECT)
-SOUND_DESELECT = pygame.mixer.Sound(SOUND_FILE_DESELECT)
-SOUND_KEYSTROKE = pygame.mixer.Sound(SOUND_FILE_KEYSTROKE)
-SOUND_FIREWORK = pygame.mixer.Sound(SOUND_FILE_FIREWORK)
-ALL_SOUNDS = [SOUND_ERROR, SOUND_BUILD, SOUND_SELECT, SOUND_DESELECT, SOUND_KEYSTROKE, SOUND_FIREWORK]
-
 # Variable used to keep track of what sound level the player wants
 SOUND_VOLUME = 1
 
 # Defines variables used for the physics engine
 PHY_BOUNCE = 0.9 # Energy lost from a collision
 PHY_PRECISION = 4 # How many times the engine loops through and calculates positions of nodes per frame
+PHY_TOLERANCE = 0 # Stops solving sticks early once none are off by more than this fraction of their length (0 always solves PHY_PRECISION times)
+PHY_MAX_PRECISION = 16 # The most times sticks are solved in a frame when PHY_TOLERANCE is used
 PHY_GRAV_3D = Vector3d(0, 0.2, 0) # Gravity vector
 PHY_GRAV_2D = Vector2d(0, 0.2) # Gravity vector used by the bubbles and fireworks
+PHY_ARRAYS = False # Uses the numpy array engine (ArrayEng.py) instead of the normal one. Much faster on big wireframes, but its results aren't exactly the same as the normal engine's (see PHY_ARRAY_SOLVER)
+PHY_SOLVER = 'order' # 'order' solves edges in the order they were built, 'colour' solves them in groups (see Wireframe.colourEdges)
+PHY_ARRAY_SOLVER = 'colour' # The solver the array engine uses. 'order' matches the normal engine exactly, but splits the edges into hundreds of tiny groups, which makes it slower than the normal engine
+PHY_COLLIDE = False # Makes separate objects collide with each other, not just the walls of the box
+PHY_NODE_RADIUS = 2 # How big a node is when colliding with other nodes and faces
+PHY_THREADS = 0 # Threads the array engine splits big groups of edges between (0 or 1 means it doesn't use threads)
+PHY_PROCESSES = 1 # Processes the array engine steps separate wireframes in (see PoolEng.py). 0 uses one for every core, 1 doesn't use processes
+PHY_PROCESS_TIMEOUT = 10 # Seconds the engine waits for its worker processes to finish a step before giving up on them
+PHY_SLEEP = False # Stops moving groups of connected nodes once they have come to rest, until something wakes them up. Much faster in still scenes, but resting things end up slightly different to where they would have settled
+PHY_SLEEP_SPEED = 0.01 # Nodes moving slower than this (distance a step) count as resting
+PHY_SLEEP_FRAMES = 60 # How many steps in a row every node of a group has to be resting before it falls asleep
+PHY_TIMESTEP = 1 / 60 # Seconds of real time each step of the engine simulates
+PHY_MAX_SUBSTEPS = 5 # The most steps the engine runs in one frame to catch up with real time
+PHY_INTERPOLATE = True # Draws nodes in between their last two positions, so movement looks smooth when steps and frames don't line up
 
 REND_PREC = 20 # How many nodes across should the grid be. (It is the only area where you can place objects)
+REND_BACKFACES = False # Doesn't draw faces on the back of closed wireframes. Off, since a wireframe squashed inside out would lose the faces that are showing
 
 # How many firework parts a bubble breaks into
 FIREWORK_PARTS = 40
@@ -97,3 +72,102 @@ GAME_STATE = 0
 # Both of these values are going to be updated soon anyway by the colour updater
 GLOBAL_COLOUR = Vector3d(0, 255, 20)
 GLOBAL_COLOUR_DARK = Vector3d(0, 255, 20)
+
+
+# Initialise the pygame and mixer modules. Does nothing if they already are
+def initPygame():
+    import pygame
+    if not pygame.get_init():
+        pygame.mixer.pre_init(44100, -16, 1, 512)
+        pygame.init()
+
+
+# Create the screen. Uses a double buffer to prevent tearing
+def initDisplay():
+    global gameDisplay
+    if 'gameDisplay' in globals():
+        return
+    initPygame()
+    import pygame
+    gameDisplay = pygame.display.set_mode(SCREEN_SIZE, pygame.DOUBLEBUF)
+
+
+# Create pygame.mixer Sound objects, based on the sound paths
+def initSound():
+    global SOUND_ERROR, SOUND_BUILD, SOUND_CLEAR, SOUND_THUMP, SOUND_SELECT, SOUND_DESELECT, SOUND_KEYSTROKE, SOUND_FIREWORK, ALL_SOUNDS
+    if 'ALL_SOUNDS' in globals():
+        return
+    initPygame()
+    import pygame
+    SOUND_ERROR = pygame.mixer.Sound(SOUND_FILE_ERROR)
+    SOUND_BUILD = pygame.mixer.Sound(SOUND_FILE_BUILD)
+    SOUND_CLEAR = pygame.mixer.Sound(SOUND_FILE_CLEAR)
+    SOUND_THUMP = pygame.mixer.Sound(SOUND_FILE_THUMP)
+    SOUND_SELECT = pygame.mixer.Sound(SOUND_FILE_SELECT)
+    SOUND_DESELECT = pygame.mixer.Sound(SOUND_FILE_DESELECT)
+    SOUND_KEYSTROKE = pygame.mixer.Sound(SOUND_FILE_KEYSTROKE)
+    SOUND_FIREWORK = pygame.mixer.Sound(SOUND_FILE_FIREWORK)
+    ALL_SOUNDS = [SOUND_ERROR, SOUND_BUILD, SOUND_SELECT, SOUND_DESELECT, SOUND_KEYSTROKE, SOUND_FIREWORK]
+
+
+# Creates the event manager, timer and achievement trackers the game uses
+def initGame():
+    global Controller, globalTimer, AchievementBoxes, globalAchievements
+    if 'globalAchievements' in globals():
+        return
+    initDisplay()
+
+    # Imported here, since Features imports this file
+    from Events import EventManager
+    from Features import Timer, AchievementBox, Achievements
+
+    # Creates global variables
+    Controller = EventManager()
+    globalTimer = Timer(evManager=Controller)
+
+    # Creates the achievement boxes that will display on the achievement screen
+    AchievementBoxes = [AchievementBox(60, 250, 150, 100, 'POPPER', False, [0, ACH_IDEALS['POPPER'], 'Ballons popped'], gameDisplay, evManager=Controller),
+                        AchievementBox(220, 250, 150, 100, 'SPEED', False, [0, ACH_IDEALS['SPEED'], 'Maxiumum speed reached'], gameDisplay, evManager=Controller),
+                        AchievementBox(380, 250, 150, 100, 'COLLIDER', False, [0, ACH_IDEALS['COLLIDER'], 'Maxiumum collision speed'], gameDisplay, evManager=Controller),
+                        AchievementBox(60, 400, 150, 100, 'NODER', False, [0, ACH_IDEALS['NODER'], 'Nodes built'], gameDisplay, evManager=Controller),
+                        AchievementBox(220, 400, 150, 100, 'EDGER', False, [0, ACH_IDEALS['EDGER'], 'Edges built'], gameDisplay, evManager=Controller),
+                        AchievementBox(380, 400, 150, 100, 'FACER', False, [0, ACH_IDEALS['FACER'], 'Faces built'], gameDisplay, evManager=Controller)
+                        ]
+
+    # Creates the achievement tracker. Keeps track on the progress the player makes
+    globalAchievements = Achievements(AchievementBoxes, gameDisplay, evManager=Controller)
+
+    # Checks to see if the achievement progress was already saved
+    try:
+        # Loads data from the file
+        vars = pickle.load(open('SAVEDATA', 'rb'))
+        globalAchievements.tracker = vars[0]
+        globalAchievements.achievements = vars[1]
+
+        # Update the achievement tracker with the new data
+        globalAchievements.update()
+    except:
+        pass
+
+
+# Creates everything. The game calls this before it starts
+def init():
+    initDisplay()
+    initSound()
+    initGame()
+
+
+# The values that are only made when first used, and the function that makes each one
+LAZY = {'gameDisplay': initDisplay,
+        'SOUND_ERROR': initSound, 'SOUND_BUILD': initSound, 'SOUND_CLEAR': initSound, 'SOUND_THUMP': initSound,
+        'SOUND_SELECT': initSound, 'SOUND_DESELECT': initSound, 'SOUND_KEYSTROKE': initSound,
+        'SOUND_FIREWORK': initSound, 'ALL_SOUNDS': initSound,
+        'Controller': initGame, 'globalTimer': initGame, 'AchievementBoxes': initGame, 'globalAchievements': initGame}
+
+
+# Python calls this when something asks for a value this module doesn't have yet (like Constants.SOUND_ERROR)
+def __getattr__(name):
+    if name in LAZY:
+        LAZY[name]()
+        return globals()[name]
+    raise AttributeError("module 'Constants' has no attribute '{}'".format(name))
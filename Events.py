@@ -1,4 +1,4 @@
-import pygame
+from weakref import WeakKeyDictionary, ref
 
 # The event super class. Every other event class is  child of this one
 class Event:
@@ -11,9 +11,17 @@ class Event:
 class TickEvent(Event):
     pass
 
-class RenderEvent(Event):
+# Sent once for every fixed step of the physics simulation. Can be sent more than once a frame (see FixedStep)
+class StepEvent(Event):
     pass
 
+class RenderEvent(Event):
+    # alpha is how far the real time is between the last two physics steps (0 to 1),
+    # so moving things can be drawn in between where they were and where they are
+    def __init__(self, alpha=1):
+        super().__init__()
+        self.alpha = alpha
+
 class BeginEvent(Event):
     pass
 
@@ -24,13 +32,16 @@ class BuildEvent(Event):
     def __init__(self, type):
         self.type = type
 
-class CollideEvent(Event):
-    def __init__(self, velocity):
-        self.velocity = velocity
-
-class MoveEvent(Event):
-    def __init__(self, speed):
-        self.velocity = speed # Yes velocity implies a direction but whatever
+# Sent by the physics engine once every frame, instead of an event for every node that moves or hits something
+class FrameEvent(Event):
+    def __init__(self):
+        super().__init__()
+        self.speed = 0      # Speed of the fastest node
+        self.impact = 0     # Speed of the hardest collision
+        self.collisions = 0 # How many collisions there were
+        self.hits = []      # The nodes that hit something. A node is in here once for every time it hit something
+        self.iterations = 0 # How many times the sticks were solved
+        self.residual = 0   # How far off the worst stick was the last time, as a fraction of its length
 
 class KeyEvent(Event):
     def __init__(self, type, action):
@@ -49,13 +60,21 @@ class MouseClick(Event):
 # and passes events to them when they occur
 
 # The event manager is based of the example used here: http://www.pygame.org/wiki/tut_design
+
+# Each listener says what types of events it wants with an 'events' attribute, a tuple of event classes.
+# Listeners without one get every event. Listeners only get the events they asked for.
 class EventManager:
     def __init__(self):
-        from weakref import WeakKeyDictionary
-        self.listeners = WeakKeyDictionary()
+        self.listeners = WeakKeyDictionary() # Each listener and the event types it wants
+
+        # The listeners that get each type of event, already sorted by layer.
+        # They are worked out the first time that type of event is pushed, and thrown away when listeners change
+        self.routes = {}
 
-    def registerListener(self, listener):
-        self.listeners[listener] = 1
+    def registerListener(self, listener, *events):
+        # The types of events can also be given here, instead of as an attribute
+        self.listeners[listener] = events or getattr(listener, 'events', (Event,))
+        self.resort()
         try:
             listener.register()
         except:
@@ -64,12 +83,34 @@ class EventManager:
     def unregisterListener(self, listener):
         if listener in self.listeners.keys():
             del self.listeners[listener]
+            self.resort()
 
-    def push(self, event):
-        # Goes through each object, going by the objects layer.
+    def resort(self):
+        # Throws away the sorted lists of listeners. Needs to be called if a listener's layer changes
+        self.routes = {}
+
+    def route(self, kind):
+        # Returns the listeners that want a type of event, going by the objects layer.
         # Reverses the order when rendering so that objects that are the first to react to events are drawn last
         # (so that they appear to be on top of everything else)
-        for listener in sorted(self.listeners.keys(), key=lambda x: x.layer, reverse=isinstance(event, RenderEvent)):
+        if kind not in self.routes:
+            listeners = [listener for listener, events in self.listeners.items() if issubclass(kind, events)]
+            listeners.sort(key=lambda x: x.layer, reverse=issubclass(kind, RenderEvent))
+
+            # Weak references, so that listeners can still be deleted when nothing else uses them
+            self.routes[kind] = [ref(listener, self.forget) for listener in listeners]
+        return self.routes[kind]
+
+    def forget(self, reference):
+        # Called when a listener is deleted
+        self.resort()
+
+    def push(self, event):
+        for reference in self.route(type(event)):
+            listener = reference()
+            if listener is None:
+                continue
+
             # If the method returns True it breaks. This is to allow events to stop going to objects.
             # For example with a mouse click event you don't want 10 objects in the same position to react to the same event
             # With this, when an object is clicked it returns True so other objects don't react
@@ -90,10 +131,42 @@ def EventAdder(func):
         # Overwrites what was in the objects constructor
         if 'layer' in kwargs:
             self.layer=kwargs['layer']
+
+        # The layer was changed after the object was registered
+        self.evManager.resort()
     return wrapper
 
+# Keeps the physics running at a fixed number of steps a second, no matter how fast the game is drawn.
+# Every frame, it is given how much real time has passed, and says how many steps need to be run to catch up.
+# If the game falls too far behind it gives up on catching up (after max steps in a frame), so it never gets stuck
+# running more and more steps to catch up with the time those steps took. The simulation slows down instead
+class FixedStep:
+    def __init__(self, step, most):
+        self.step = step # Seconds each step simulates
+        self.most = most # The most steps run in one frame
+        self.time = 0    # Real time that hasn't been simulated yet
+
+    # Returns how many steps to run for this frame
+    def advance(self, elapsed):
+        self.time += elapsed
+        steps = min(int(self.time // self.step), self.most)
+        self.time -= steps * self.step
+
+        # Throws away the time it couldn't catch up on
+        if steps == self.most:
+            self.time %= self.step
+        return steps
+
+    # How far through the next step the real time is
+    @property
+    def alpha(self):
+        return min(self.time / self.step, 1)
+
+
 # The keyboard Class. Manages key presses and mouse clicks.
 class KeyboardController:
+    events = (TickEvent,)
+
     @EventAdder
     def __init__(self, **kwargs):
         # Has a low layer so that it is the first to react to a events
@@ -103,6 +176,9 @@ class KeyboardController:
     # Checks to see if any buttons were clicked or released, and if so, fires events for them
     def notify(self, event):
         if isinstance(event, TickEvent):
+            # pygame is imported here so that importing the events (which the physics engine does) doesn't load it
+            import pygame
+
             for event in pygame.event.get():
                 if event.type == pygame.QUIT:
                     # Quiting the window is discouraged, since data will only be saved if you exit the game using the button
@@ -6,11 +6,12 @@ from statistics import median
 from gui import *
 import pickle
 import Constants
-pygame.init()
 
 # This class, destroys objects after x amount of frames
 # This is used for the notifications that display on the game
 class Timer:
+    events = (TickEvent,)
+
     @EventAdder
     def __init__(self, **kwargs):
         self.items = {}
@@ -52,6 +53,8 @@ class Circle:
 
 # A circle, that when clicked on, explodes
 class CircleToy(Circle):
+    events = (TickEvent, MouseClick, RenderEvent)
+
     @EventAdder
     def __init__(self, pos, radius, display, maker, **kwargs):
         super().__init__(pos, radius)
@@ -96,6 +99,8 @@ class CircleToy(Circle):
 
 # A firework particle
 class Firework(CircleToy):
+    events = (TickEvent, RenderEvent)
+
     @EventAdder
     def __init__(self, pos, radius, velocity, colour, display, **kwargs):
         self.pos = pos
@@ -130,6 +135,8 @@ class Firework(CircleToy):
 
 # A class that constantly makes Circle Toys
 class Maker:
+    events = (TickEvent,)
+
     @EventAdder
     def __init__(self, display, **kwargs):
         self.display = display
@@ -148,6 +155,8 @@ class Maker:
 # An achievement box. Stores data about the achievement
 # And display information about the achievement when the mouse hovers over it
 class AchievementBox(Rect):
+    events = (TickEvent, MouseClick, RenderEvent)
+
     @EventAdder
     def __init__(self, x, y, w, h, text, unlock, values, surface, **kwargs):
         super().__init__(x, y, w, h)
@@ -194,6 +203,8 @@ class AchievementBox(Rect):
 # Class that keeps track of the achievements the player unlocks
 # Updates the achievement boxes
 class Achievements:
+    events = (PopEvent, FrameEvent, BuildEvent)
+
     @EventAdder
     def __init__(self, boxes, display, **kwargs):
         self.boxes = boxes
@@ -248,28 +259,28 @@ class Achievements:
         # Same thing as above, but instead of adding to the tracker value, the tracker value is set to the speed
         # if the speed is greater than the tracker value
         # (since this keeps track of the highest speed a node has experienced
-        if isinstance(event, MoveEvent):
-            if event.velocity > self.tracker['SPEED']:
+        # The engine sends one FrameEvent a frame, with the fastest speed and hardest collision of that frame
+        if isinstance(event, FrameEvent):
+            if event.speed > self.tracker['SPEED']:
                 for box in self.boxes:
                     if box.text == 'SPEED':
-                        box.values[0] = event.velocity
-                        if event.velocity >= self.ideals['SPEED'] and not self.achievements['SPEED']:
+                        box.values[0] = event.speed
+                        if event.speed >= self.ideals['SPEED'] and not self.achievements['SPEED']:
                             box.unlocked = True
                             self.achievements['SPEED'] = True
-                            self.tracker['SPEED'] = event.velocity
+                            self.tracker['SPEED'] = event.speed
                             Constants.globalTimer.registerItem(TextBoxEvent.from_text(Vector2d(64, 64), 'Achievement unlocked: SPEED', self.display, evManager=self.evManager, layer=-3), 60)
 
 
-        # Same thing as above
-        if isinstance(event, CollideEvent):
-            if event.velocity > self.tracker['COLLIDER']:
+            # Same thing as above
+            if event.collisions and event.impact > self.tracker['COLLIDER']:
                 for box in self.boxes:
                     if box.text == 'COLLIDER':
-                        box.values[0] = event.velocity
-                        if event.velocity >= self.ideals['COLLIDER'] and not self.achievements['COLLIDER']:
+                        box.values[0] = event.impact
+                        if event.impact >= self.ideals['COLLIDER'] and not self.achievements['COLLIDER']:
                             box.unlocked = True
                             self.achievements['COLLIDER'] = True
-                            self.tracker['COLLIDER'] = event.velocity
+                            self.tracker['COLLIDER'] = event.impact
                             Constants.globalTimer.registerItem(
                                 TextBoxEvent.from_text(Vector2d(64, 64), 'Achievement unlocked: COLLIDER', self.display,
                                                        evManager=self.evManager, layer=-3), 60)
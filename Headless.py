@@ -0,0 +1,236 @@
+# Runs the physics engine without a window or any sound.
+# Used to benchmark the engine, and to run simulations on computers without a screen.
+
+# Usage:
+#   python Headless.py FABRIC -n 1000            Simulates a scene file 1000 times and reports how long it took
+#   python Headless.py --bench                   Runs every scene file, and cloths of growing size, with every engine
+#   python Headless.py --alloc                   Counts how many vectors the engine makes every step
+#   python Headless.py FABRIC+BABEL --engine pool   Simulates two scenes in the same box, in separate processes
+#   python Headless.py --tolerance 0.001         Solves sticks until they are within 0.1% of their length, instead of a set number of times
+#   python Headless.py FABRIC --sleep            Puts islands to sleep once they have come to rest (like PHY_SLEEP)
+
+import os
+
+# pygame needs a display and an audio device. These tell it to use fake ones.
+# They have to be set before anything imports pygame
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+os.environ.setdefault('PYGAME_HIDE_SUPPORT_PROMPT', '1')
+
+import sys
+import time
+import argparse
+import tracemalloc
+import PhysEng
+import ArrayEng
+import PoolEng
+import Wireframe
+import Vectors
+import Scene
+from Events import EventManager
+
+# The scene files that come with the game
+SCENES = ['FABRIC', 'BABEL', 'LANTERN', 'MRRAGDOLL', 'WRECKINGBALL', 'FALL']
+
+# Sizes of the made up cloths used to see how the engine copes with bigger wireframes (size x size nodes)
+CLOTHS = [10, 20, 40, 80]
+
+# The methods of the engine that get timed
+PHASES = ['movepoints', 'movesticks', 'constrainPoints', 'findContacts', 'collideNodes']
+
+ENGINES = {'object': PhysEng.Engine, 'array': ArrayEng.ArrayEngine, 'pool': PoolEng.PoolEngine}
+
+BOX = Vectors.Vector3d(100, 100, 100)
+
+
+# Creates a hanging cloth of size x size nodes, pinned along its top row
+def cloth(size):
+    return Wireframe.cloth(size, size, 80 / (size - 1), Vectors.Vector3d(10, 10, 50))
+
+
+# Loads a scene. Either a scene file, or 'cloth<size>' for a made up cloth.
+# Scene files can be memory mapped instead of read (see Scene.loadMapped)
+def loadScene(name, mapped=False):
+    if name.startswith('cloth'):
+        return cloth(int(name[5:]))
+    if mapped:
+        return Scene.loadMapped(name)
+    return Scene.load(name)
+
+
+# Wraps a method so the time spent in it is added to times[name]
+def timed(method, times, name):
+    def wrapper(*args, **kwargs):
+        start = time.perf_counter()
+        result = method(*args, **kwargs)
+        times[name] += time.perf_counter() - start
+        return result
+    return wrapper
+
+
+# Loads every scene in a name like 'FABRIC+cloth20'
+def loadScenes(name, mapped=False):
+    return [loadScene(part, mapped) for part in name.split('+')]
+
+
+def makeEngine(wireframe, engine, **options):
+    return makeWorld([wireframe], engine, **options)
+
+
+def makeWorld(wireframes, engine, **options):
+    return ENGINES[engine](wireframes, 0.99, BOX, sound=False, evManager=EventManager(), **options)
+
+
+# Simulates a scene and returns a dictionary of results
+def run(name, steps, engine='object', mapped=False, **options):
+    start = time.perf_counter()
+    wireframes = loadScenes(name, mapped)
+    load = time.perf_counter() - start
+
+    world = makeWorld(wireframes, engine, **options)
+
+    # Times each phase of the engine
+    times = {phase: 0 for phase in PHASES}
+    for phase in PHASES:
+        setattr(world, phase, timed(getattr(world, phase), times, phase))
+
+    iterations = 0
+    start = time.perf_counter()
+    for i in range(steps):
+        world.simulate(False, False)
+        iterations += world.iterations
+    total = time.perf_counter() - start
+    residual = world.residual
+
+    # Measures the peak memory separately, as tracing memory slows everything down
+    tracemalloc.start()
+    close(world)
+    world = makeWorld(loadScenes(name, mapped), engine, **options)
+    for i in range(min(steps, 20)):
+        world.simulate(False, False)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    close(world)
+
+    return {'scene': name,
+            'engine': engine,
+            'nodes': sum(len(wireframe.nodes) for wireframe in wireframes),
+            'edges': sum(len(wireframe.edges) for wireframe in wireframes),
+            'steps': steps,
+            'load': load * 1000,
+            'rate': steps / total,
+            'iterations': iterations / steps,
+            'residual': residual,
+            'phases': {phase: times[phase] / steps * 1000 for phase in PHASES},
+            'peak': peak / 1024}
+
+
+# Stops the threads and worker processes of the array engines
+def close(world):
+    if isinstance(world, ArrayEng.ArrayEngine):
+        world.close()
+
+
+def heading():
+    return '{:<14}{:<8}{:>7}{:>7}{:>10}{:>10}{:>7}{:>10}{:>12}{:>12}{:>12}{:>12}{:>12}{:>11}'.format(
+        'scene', 'engine', 'nodes', 'edges', 'load ms', 'steps/s', 'iters', 'residual', 'points ms', 'sticks ms', 'walls ms', 'broad ms', 'collide ms', 'peak KB')
+
+
+# Turns a result into one line of the table
+def line(result):
+    return '{scene:<14}{engine:<8}{nodes:>7}{edges:>7}{load:>10.2f}{rate:>10.1f}{iterations:>7.2f}{residual:>10.2e}'.format(**result) + \
+           ''.join('{:>12.3f}'.format(result['phases'][phase]) for phase in PHASES) + \
+           '{:>11.0f}'.format(result['peak'])
+
+
+def report(results):
+    print(heading())
+    for result in results:
+        print(line(result))
+
+
+# The constructors of every vector class. Counting calls to these counts how many vectors get made
+VECTORS = [Vectors.Vector3d, Vectors.Vector2d, Vectors.Verlet, Vectors.OldPosition]
+
+
+# Simulates a scene and counts the vectors made each step, and how long each step takes.
+# Vectors are counted with a profiler, which slows everything down, so the steps are timed separately
+def allocations(name, steps, engine='object', **options):
+    world = makeWorld(loadScenes(name), engine, **options)
+    constructors = set(kind.__init__.__code__ for kind in VECTORS)
+    made = [0]
+
+    def profiler(frame, event, arg):
+        if event == 'call' and frame.f_code in constructors:
+            made[0] += 1
+
+    sys.setprofile(profiler)
+    try:
+        for i in range(steps):
+            world.simulate(False, False)
+    finally:
+        sys.setprofile(None)
+
+    iterations = 0
+    start = time.perf_counter()
+    for i in range(steps):
+        world.simulate(False, False)
+        iterations += world.iterations
+    total = time.perf_counter() - start
+
+    close(world)
+    return {'scene': name, 'engine': engine, 'vectors': made[0] / steps, 'time': total / steps * 1000}
+
+
+def allocationReport(steps, **options):
+    print('{:<14}{:<8}{:>14}{:>12}'.format('scene', 'engine', 'vectors/step', 'ms/step'))
+    for name in SCENES + ['cloth{}'.format(CLOTHS[0])]:
+        print('{scene:<14}{engine:<8}{vectors:>14.1f}{time:>12.3f}'.format(**allocations(name, steps, **options)))
+
+
+# Runs every scene and cloth with every engine that can run. Prints each result as soon as it is done
+def benchmark(steps, **options):
+    engines = ['object', 'array'] if ArrayEng.np else ['object']
+    results = []
+    print(heading())
+    for name in SCENES + ['cloth{}'.format(size) for size in CLOTHS]:
+        for engine in engines:
+            results.append(run(name, steps, engine, **options))
+            print(line(results[-1]))
+    return results
+
+
+def main(args):
+    parser = argparse.ArgumentParser(description='Runs the physics engine without a display')
+    parser.add_argument('scenes', nargs='*', help="scene files, or cloth<size> for a made up cloth. Join scenes with + to simulate them together")
+    parser.add_argument('-n', '--steps', type=int, default=300, help='how many frames to simulate')
+    parser.add_argument('--engine', choices=sorted(ENGINES), default='object')
+    parser.add_argument('--solver', choices=['order', 'colour'], help="how edges are solved (the object engine uses 'order' and the array engines 'colour' if this isn't given)")
+    parser.add_argument('--collide', action='store_true', help='turns on node collisions')
+    parser.add_argument('--processes', type=int, default=0, help='processes the pool engine uses (0 uses one for every core)')
+    parser.add_argument('--tolerance', type=float, default=0, help='solves sticks until none are off by more than this fraction of their length')
+    sleeping = parser.add_mutually_exclusive_group()
+    sleeping.add_argument('--sleep', dest='sleep', action='store_true', default=None, help='puts resting islands to sleep (the default is PHY_SLEEP, like the game)')
+    sleeping.add_argument('--awake', dest='sleep', action='store_false', help='never puts resting islands to sleep')
+    parser.add_argument('--mapped', action='store_true', help='memory maps scene files instead of reading them')
+    parser.add_argument('--bench', action='store_true', help='runs every scene and cloth with every engine')
+    parser.add_argument('--alloc', action='store_true', help='counts the vectors made every step')
+    args = parser.parse_args(args)
+
+    options = {'collisions': args.collide, 'tolerance': args.tolerance}
+    if args.sleep is not None:
+        options['sleep'] = args.sleep
+    if args.solver:
+        options['solver'] = args.solver
+    if args.engine == 'pool':
+        options['processes'] = args.processes
+    if args.bench:
+        benchmark(args.steps, **options)
+    elif args.alloc:
+        allocationReport(args.steps, engine=args.engine, **options)
+    else:
+        report([run(name, args.steps, args.engine, args.mapped, **options) for name in args.scenes or SCENES])
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
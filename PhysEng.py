@@ -1,12 +1,135 @@
 import Wireframe
 import Vectors
-import statistics
-import pygame
+import math
+import Constants
 from Events import *
 from Constants import *
 
-pygame.mixer.pre_init(44100, -16, 1, 512)
-pygame.init()
+# A grid that splits 3d space into cubes.
+# Things are put in the cubes they are in, so finding things close to a point only means looking in the
+# cubes around it, instead of looking through everything
+class SpaceGrid:
+    def __init__(self, size):
+        self.size = size # The width of each cube
+        self.cells = {}
+
+    def cell(self, point):
+        return int(point.x // self.size), int(point.y // self.size), int(point.z // self.size)
+
+    def add(self, point, item):
+        self.cells.setdefault(self.cell(point), []).append(item)
+
+    def inBox(self, low, high):
+        # Yields every item in the cubes the box from low to high touches
+        lowcell = [int(value // self.size) for value in low]
+        highcell = [int(value // self.size) for value in high]
+
+        # A big box covers lots of empty cubes. If there are fewer cubes with something in them than cubes in the box,
+        # it goes through those instead
+        if (highcell[0] - lowcell[0] + 1) * (highcell[1] - lowcell[1] + 1) * (highcell[2] - lowcell[2] + 1) > len(self.cells):
+            for (x, y, z), items in self.cells.items():
+                if lowcell[0] <= x <= highcell[0] and lowcell[1] <= y <= highcell[1] and lowcell[2] <= z <= highcell[2]:
+                    for item in items:
+                        yield item
+            return
+
+        for x in range(lowcell[0], highcell[0] + 1):
+            for y in range(lowcell[1], highcell[1] + 1):
+                for z in range(lowcell[2], highcell[2] + 1):
+                    for item in self.cells.get((x, y, z), ()):
+                        yield item
+
+    def near(self, point):
+        # Yields every item in the cube the point is in, and the 26 cubes around it
+        cellx, celly, cellz = self.cell(point)
+        for x in (cellx - 1, cellx, cellx + 1):
+            for y in (celly - 1, celly, celly + 1):
+                for z in (cellz - 1, cellz, cellz + 1):
+                    for item in self.cells.get((x, y, z), ()):
+                        yield item
+
+# Boxes are stored as [lowx, lowy, lowz, highx, highy, highz]
+def overlap(box, other):
+    return all(box[k] <= other[k + 3] and other[k] <= box[k + 3] for k in range(3))
+
+def inside(point, box):
+    return box[0] <= point.x <= box[3] and box[1] <= point.y <= box[4] and box[2] <= point.z <= box[5]
+
+# Sweep and prune. Finds every pair of overlapping boxes without checking every box against every other box
+# Boxes are sorted by their lowest x value. Going through them in that order, a box can only overlap the boxes
+# that started before it and haven't ended yet.
+# Returns a dictionary of each box key and the keys of the boxes it overlaps (boxes that overlap nothing are left out)
+def sweep(boxes):
+    neighbours = {}
+    active = []
+    for key in sorted(boxes, key=lambda key: boxes[key][0]):
+        box = boxes[key]
+        active = [other for other in active if boxes[other][3] >= box[0]]
+        for other in active:
+            if overlap(box, boxes[other]):
+                neighbours.setdefault(key, []).append(other)
+                neighbours.setdefault(other, []).append(key)
+        active.append(key)
+    return neighbours
+
+# Returns whether the sticks have been solved enough times this frame, given how many times they have been solved
+# and how far off the worst one was the last time (see Engine.__init__)
+def finished(iterations, residual, precision, tolerance, limit):
+    if not tolerance:
+        return iterations >= precision
+    return residual <= tolerance or iterations >= limit
+
+# A group of nodes connected to each other by edges (see Wireframe.islands)
+# Islands that have barely moved for a while are put to sleep, and the engine skips them until something wakes them up
+class Island:
+    def __init__(self, indices):
+        self.indices = indices # Indices of the nodes in the wireframe
+        self.asleep = False
+        self.still = 0         # How many frames in a row it has barely moved
+        self.last = None       # x, y, z of every node at the end of the last frame
+
+    # Returns the furthest (squared) any node moved since the last time this was called
+    def moved(self, nodes):
+        last = self.last
+        if last is None:
+            self.last = [value for i in self.indices for value in (nodes[i].x, nodes[i].y, nodes[i].z)]
+            return math.inf
+
+        furthest = 0
+        k = 0
+        for i in self.indices:
+            node = nodes[i]
+            x, y, z = node.x, node.y, node.z
+            distance = (x - last[k]) ** 2 + (y - last[k + 1]) ** 2 + (z - last[k + 2]) ** 2
+            if distance > furthest:
+                furthest = distance
+            last[k] = x
+            last[k + 1] = y
+            last[k + 2] = z
+            k += 3
+        return furthest
+
+
+# The islands of a wireframe, and which of them are asleep
+class Islands:
+    def __init__(self, object):
+        self.object = object
+        self.version = object.version
+        self.islands = [Island(indices) for indices in object.islands()]
+        self.asleep = 0    # How many islands are asleep
+        self.owners = None # The island of every node (by id), only made once something needs it
+        self.awake = None  # What is awake (see Engine.awake), made again whenever an island falls asleep or wakes up
+
+    # Returns the island a node is in, or None if it isn't in the wireframe
+    def find(self, node):
+        if self.owners is None:
+            nodes = self.object.nodes
+            self.owners = {id(nodes[i]): island for island in self.islands for i in island.indices}
+        return self.owners.get(id(node))
+
+    def changed(self):
+        self.awake = None
+
 
 # The engine for the game
 # Uses Verlet integration
@@ -18,17 +141,76 @@ pygame.init()
 # It is designed to know nothing about the rest of the game
 class Engine:
     # Event handler is only used, as this pushes events that the achievement objects takes care off.
+    # It doesn't listen to any events itself
+    events = ()
+
     @EventAdder
     def __init__(self, objects, friction, box, **kwargs):
         self.grav = Constants.PHY_GRAV_3D
         self.friction = friction
         self.box = box
+
+        # The order edges are solved in.
+        # 'order' solves them in list order.
+        # 'colour' solves them one colour group at a time (see Wireframe.colourEdges), so the result doesn't
+        # depend on the order edges were built in, and the ArrayEngine can solve a whole group at once
+        self.solver = kwargs.get('solver', 'order')
+        self.threads = kwargs.get('threads', 0) # Threads used to solve big groups of edges (only used by the ArrayEngine)
+
+        # Whether nodes collide with the nodes and faces of other wireframes (not just the walls of the box)
+        # Every node is treated as a ball with the given radius
+        self.collisions = kwargs.get('collisions', False)
+        self.radius = kwargs.get('radius', Constants.PHY_NODE_RADIUS)
+        self.contacts = ([], []) # The nodes and faces that might touch this step (see findContacts)
+
+        self.sound = kwargs.get('sound', True) # Whether collisions make a sound
+
+        # How many times the sticks are solved each frame.
+        # With a tolerance, the engine stops as soon as no stick is off by more than that fraction of its length,
+        # and keeps going past precision (up to limit times) while they are. Without one it always goes precision times
+        self.precision = kwargs.get('precision', Constants.PHY_PRECISION)
+        self.tolerance = kwargs.get('tolerance', Constants.PHY_TOLERANCE)
+        self.limit = kwargs.get('limit', Constants.PHY_MAX_PRECISION)
+        self.iterations = 0 # How many times the sticks were solved last frame
+        self.residual = 0   # How far off the worst stick was the last time they were solved
+
+        # Whether islands that have stopped moving are put to sleep. Sleeping islands aren't moved at all,
+        # until something hits them, the player grabs them, or wake is called
+        self.sleep = kwargs.get('sleep', Constants.PHY_SLEEP)
+        self.sleepers = {} # The Islands of every object (by id)
+        self.asleep = 0    # How many islands are asleep, in every object
+
+        # What happened this frame. Sent to the event manager at the end of every frame
+        self.frame = FrameEvent()
+
+        # Whether the engine remembers where nodes were before each step, so they can be drawn in between (see blend)
+        self.interpolate = kwargs.get('interpolate', False)
+        self.previous = None
+        self.current = None
+
         self.objects = objects
 
+    # Giving the engine new objects (or adding some) forgets where the nodes were before the last step,
+    # so the new objects are never drawn in between where the old ones were (see blend)
+    @property
+    def objects(self):
+        return self.wireframes
+
+    @objects.setter
+    def objects(self, objects):
+        self.wireframes = objects
+        self.forget()
+
     def additem(self, *objects):
         for object in objects:
             assert isinstance(object, Wireframe.Wireframe), 'Unexpected type'
             self.objects.append(object)
+        self.forget()
+
+    # Forgets where the nodes were before the last step, and where they were stepped to (see blend and restore)
+    def forget(self):
+        self.previous = None
+        self.current = None
 
     def simulate(self, point, holder):
         # Moves a point to the holder position if point and holder arn't False
@@ -37,7 +219,28 @@ class Engine:
             point.x = holder.x
             point.y = holder.y
             point.z = holder.z
+            self.wake(point)
 
+        self.frame = FrameEvent()
+        if self.interpolate:
+            self.previous = self.snapshot()
+
+        self.step()
+
+        self.frame.iterations = self.iterations
+        self.frame.residual = self.residual
+
+        if self.sleep:
+            self.settle()
+
+        if self.sound and self.frame.impact > 1:
+            self.thump(self.frame.impact)
+
+        # Only one event is sent a frame, instead of one for every node that moved or hit something
+        self.evManager.push(self.frame)
+
+    # Moves every node, then solves the sticks and walls
+    def step(self):
         # Performs calculations on all the points the engine has stored
         self.movepoints()
 
@@ -49,101 +252,365 @@ class Engine:
         # those nodes might be connected to making it less realistic.
         #  (If you want to see this change the precision to 1 and load file fabric and play with it. Then compare with the precision at 10)
         # Since the movesticks method moves the nodes it puts the points back inside the box if the movesticks pushed them out
-        for i in range(Constants.PHY_PRECISION):
-            self.movesticks()
+        # The worst stick is measured every time, so scenes at rest can stop early and stretched ones can keep going
+        self.iterations = 0
+        if self.collisions:
+            self.contacts = self.findContacts()
+        while True:
+            self.residual = self.movesticks()
+            if self.collisions:
+                self.collideNodes()
             self.constrainPoints()
+            self.iterations += 1
+            if finished(self.iterations, self.residual, self.precision, self.tolerance, self.limit):
+                break
+
+    # Returns the Islands of an object, working them out again if the object has changed
+    def islands(self, object):
+        islands = self.sleepers.get(id(object))
+        if islands is None or islands.object is not object or islands.version != object.version:
+            if islands is not None:
+                self.asleep -= islands.asleep
+            islands = self.sleepers[id(object)] = self.group(object)
+
+            # Forgets objects the engine doesn't have any more
+            if len(self.sleepers) > len(self.objects):
+                current = set(map(id, self.objects))
+                for key in [key for key in self.sleepers if key not in current]:
+                    self.asleep -= self.sleepers.pop(key).asleep
+        return islands
+
+    def group(self, object):
+        return Islands(object)
+
+    # Returns the nodes and edges of an object that aren't asleep
+    def awake(self, object):
+        if not self.asleep:
+            return object.nodes, self.sticks(object)
+
+        islands = self.islands(object)
+        if not islands.asleep:
+            return object.nodes, self.sticks(object)
+        if islands.awake is None:
+            nodes = [node for node in object.nodes if not islands.find(node).asleep]
+            edges = [edge for edge in self.sticks(object) if not islands.find(edge.first).asleep]
+            islands.awake = (nodes, edges)
+        return islands.awake
+
+    # Puts islands to sleep once none of their nodes have moved more than PHY_SLEEP_SPEED a frame,
+    # for PHY_SLEEP_FRAMES frames in a row
+    def settle(self):
+        for object in self.objects:
+            islands = self.islands(object)
+            for island in islands.islands:
+                if not island.asleep:
+                    self.rest(islands, island, island.moved(object.nodes))
+
+    # Counts how long an island has been still for, given how far (squared) it moved this frame
+    def rest(self, islands, island, moved):
+        if moved > Constants.PHY_SLEEP_SPEED ** 2:
+            island.still = 0
+            return
+        island.still += 1
+        if island.still < Constants.PHY_SLEEP_FRAMES:
+            return
+
+        # Stops the nodes completely, so they don't carry on moving when they wake up
+        nodes = islands.object.nodes
+        for i in island.indices:
+            node = nodes[i]
+            node.ox = node.x
+            node.oy = node.y
+            node.oz = node.z
+
+        island.asleep = True
+        islands.asleep += 1
+        self.asleep += 1
+        islands.changed()
+
+    # Wakes up the islands the nodes are in
+    def wake(self, *nodes):
+        if not self.asleep:
+            return
+        for node in nodes:
+            for islands in self.sleepers.values():
+                # Islands of objects that have changed are worked out again (and woken up) anyway
+                if not islands.asleep or islands.version != islands.object.version:
+                    continue
+                island = islands.find(node)
+                if island is None:
+                    continue
+                if island.asleep:
+                    island.asleep = False
+                    island.last = None
+                    islands.asleep -= 1
+                    self.asleep -= 1
+                    islands.changed()
+                island.still = 0
+                break
 
     def constrainPoints(self):
         # Checks to see if any points are outside of the box, and if so, moves them back in
+        boxx, boxy, boxz = self.box.x, self.box.y, self.box.z
         for object in self.objects:
-            for point in object:
+            for point in self.awake(object)[0]:
+                x, y, z = point.x, point.y, point.z
 
-                # This vector is only used if the node is outside the box
-                # If the node is outside the box then it is used to set the
-                # old position in such a way where the next frame will get
+                # Most nodes are inside the box, so they are skipped straight away
+                if 0 <= x <= boxx and 0 <= y <= boxy and 0 <= z <= boxz:
+                    continue
+
+                # This velocity is only worked out if the node is outside the box
+                # It is used to set the old position in such a way where the next frame will get
                 # the nodes velocity to be bouncing off the wall
-                velocity = (point - point.old) * PHY_BOUNCE
-                collide = False
+                vx = (x - point.ox) * PHY_BOUNCE
+                vy = (y - point.oy) * PHY_BOUNCE
+                vz = (z - point.oz) * PHY_BOUNCE
 
                 # Checks to see if the the nodes x coordinate is outside the box
-                if not 0 <= point.x <= self.box.x:
+                if not 0 <= x <= boxx:
                     # Sets the x coordinate to the edge of the box, that the node passed
-                    point.x = statistics.median([0, point.x, self.box.x])
+                    point.x = 0 if x < 0 else boxx
                     # Sets the old x to the edge of the box, plus the veloctity, so the next frame it goes away from the wall
                     # (Since the velocity is calculated by getting the vector from the old pos to the new pos)
-                    point.old.x = point.x + velocity.x
-                    collide = True
+                    point.ox = point.x + vx
+
+                if not 0 <= y <= boxy:
+                    point.y = 0 if y < 0 else boxy
+                    point.oy = point.y + vy
+
+                if not 0 <= z <= boxz:
+                    point.z = 0 if z < 0 else boxz
+                    point.oz = point.z + vz
+
+                # A collision did occur
+                self.collide(math.sqrt(vx ** 2 + vy ** 2 + vz ** 2), point)
+
+    # Returns the positions of every node of every object
+    def snapshot(self):
+        return [[(node.x, node.y, node.z) for node in object] for object in self.objects]
+
+    # Moves every node to in between where it was before the last step, and where it is now.
+    # alpha = 0 is where it was, and alpha = 1 is where it is. Used to draw the nodes between steps.
+    # restore has to be called afterwards to put the nodes back
+    def blend(self, alpha):
+        self.current = None
+        if not self.previous or alpha >= 1:
+            return
+        self.current = self.snapshot()
+        for object, previous in zip(self.objects, self.previous):
+            # Objects that changed since the last step are left where they are
+            if len(previous) != len(object.nodes):
+                continue
+            for node, (x, y, z) in zip(object, previous):
+                node.x = x + (node.x - x) * alpha
+                node.y = y + (node.y - y) * alpha
+                node.z = z + (node.z - z) * alpha
+
+    # Puts the nodes back after blend
+    def restore(self):
+        if self.current is None:
+            return
+        for object, current in zip(self.objects, self.current):
+            for node, (x, y, z) in zip(object, current):
+                node.x = x
+                node.y = y
+                node.z = z
+        self.current = None
+
+    # Reacts to nodes hitting something, given the speed they hit it at
+    def collide(self, speed, *nodes):
+        # Adds the collision to this frames summary
+        self.frame.impact = max(self.frame.impact, speed)
+        self.frame.collisions += 1
+        self.frame.hits.extend(nodes)
+
+        # Something hit these nodes, so they can't stay asleep
+        self.wake(*nodes)
+
+    # Plays a thump sound, with the volume proportionate to the collision speed.
+    # Only called once a frame, for the hardest collision, so lots of nodes hitting a wall at once only makes one sound
+    def thump(self, speed):
+        # The sound is loaded once, the first time it is needed, so the engine can be used without pygame
+        sound = Constants.SOUND_THUMP
+
+        # Restarts the sound if it is still playing, like a single music channel would
+        sound.stop()
+        sound.set_volume(speed / 10)
+        sound.play()
 
-                if not 0 <= point.y <= self.box.y:
-                    point.y = statistics.median([0, point.y, self.box.y])
-                    point.old.y = point.y + velocity.y
-                    collide = True
+    # Finds the nodes and faces from different objects that are close enough to touch this step (the broad phase).
+    # An object is a group of nodes connected by edges (see Wireframe.islands), so two separate
+    # things in the same wireframe collide too. Nodes that are connected are kept apart by their edges instead.
+    # It is only done once a step, before the sticks are solved. Everything it finds is checked by collideNodes
+    # every time the sticks are solved. Returns a list of pairs of nodes, and a list of nodes and the faces they might hit
+    def findContacts(self):
+        # Works out which object every node belongs to, and the box around each object
+        owners = {}
+        boxes = {}
+        margin = self.radius
+        for i, object in enumerate(self.objects):
+            for j, island in enumerate(object.islands()):
+                nodes = [object.nodes[index] for index in island]
+                for node in nodes:
+                    owners[id(node)] = (i, j)
 
-                if not 0 <= point.z <= self.box.z:
-                    point.z = statistics.median([0, point.z, self.box.z])
-                    point.old.z = point.z + velocity.z
-                    collide = True
+                    # The margin also covers how far nodes moved this frame,
+                    # so fast nodes that went right through a face are still found
+                    margin = max(margin, self.radius + abs(node.x - node.ox) + abs(node.y - node.oy) + abs(node.z - node.oz))
+                boxes[(i, j)] = (min(node.x for node in nodes), min(node.y for node in nodes), min(node.z for node in nodes),
+                                 max(node.x for node in nodes), max(node.y for node in nodes), max(node.z for node in nodes))
 
-                # If a collision did occur
-                if collide:
+        # The broad phase. Uses sweep and prune to find which objects have overlapping boxes
+        # Only nodes and faces inside the box of another object need to be looked at
+        boxes = {owner: [value - margin for value in box[:3]] + [value + margin for value in box[3:]] for owner, box in boxes.items()}
+        neighbours = sweep(boxes)
+        if not neighbours:
+            return [], []
 
-                    # Sends a collision event to the event Manager, with the speed of the collision
-                    self.evManager.push(CollideEvent(velocity.length()))
+        # Puts every node that is inside another objects box into a grid.
+        # The squares are as wide as two nodes touching, plus how far the fastest node moved this frame,
+        # so nodes that get close enough to touch while the sticks are solved are still in squares next to each other
+        nodegrid = SpaceGrid(self.radius + margin)
+        for object in self.objects:
+            for node in object:
+                owner = owners[id(node)]
+                if any(inside(node, boxes[other]) for other in neighbours.get(owner, ())):
+                    nodegrid.add(node, (owner, node))
+
+        pairs = []
+        for owner, node in [item for cell in nodegrid.cells.values() for item in cell]:
+            for otherowner, other in nodegrid.near(node):
+                # Each pair is only checked once, and nodes of the same object don't collide
+                if otherowner != owner and id(node) < id(other):
+                    pairs.append((node, other))
+
+        # Finds the nodes around every face that is inside another objects box
+        hits = []
+        for object in self.objects:
+            for face in object.faces:
+                owner = owners[id(face.first)]
+                if owner not in neighbours:
+                    continue
+                first, second, third = face.first, face.second, face.third
+                low = [min(first.x, second.x, third.x) - margin, min(first.y, second.y, third.y) - margin, min(first.z, second.z, third.z) - margin]
+                high = [max(first.x, second.x, third.x) + margin, max(first.y, second.y, third.y) + margin, max(first.z, second.z, third.z) + margin]
+                if not any(overlap(low + high, boxes[other]) for other in neighbours[owner]):
+                    continue
+                box = low + high
+                for nodeowner, node in nodegrid.inBox(low, high):
+                    if nodeowner != owner and inside(node, box):
+                        hits.append((node, face))
+        return pairs, hits
+
+    # Pushes apart the nodes and faces found by findContacts that are touching
+    def collideNodes(self):
+        pairs, hits = self.contacts
+        for node, other in pairs:
+            self.collideNodePair(node, other)
+        for node, face in hits:
+            self.collideNodeFace(node, face)
+
+    # Pushes two nodes apart if they are touching
+    def collideNodePair(self, node, other):
+        rel = node - other
+        distance = rel.length()
+        if distance >= self.radius * 2 or node.w + other.w == 0:
+            return
+
+        # Nodes in exactly the same spot are pushed apart vertically
+        if distance == 0:
+            rel = Vectors.Vector3d(0, -1, 0)
+            distance = 1
+
+        # Splits the distance they need to move between the two nodes. Pinned nodes don't move
+        offset = rel * ((self.radius * 2 - distance) / distance / (node.w + other.w))
+        node.addScaled(offset, node.w)
+        other.subScaled(offset, other.w)
+
+        self.collide(((node - node.old) - (other - other.old)).length(), node, other)
+
+    # Pushes a node out of a face if it is touching it, or if it went through it this frame
+    def collideNodeFace(self, node, face):
+        # Gets the normal of the face, and how far the node is from the plane the face is on (now and last frame)
+        normal = Vectors.Vector3d.returnCrossProduct(face.second - face.first, face.third - face.first)
+        normal.normalise()
+        if normal.length() == 0:
+            return
+        height = Vectors.Vector3d.dotProduct(node - face.first, normal)
+        oldheight = Vectors.Vector3d.dotProduct(node.old - face.first, normal)
 
-                    if velocity.length() > 1:
-                        # Plays a thump sound, with the volume proportionate to the collision speed
-                        volume = velocity.length() / 10
-                        pygame.mixer.music.load(SOUND_FILE_THUMP)
-                        pygame.mixer.music.set_volume(volume)
-                        pygame.mixer.music.play(0)
+        if (height < 0) != (oldheight < 0):
+            # The node went through the plane. Uses the point where it went through, and pushes it back to the side it came from
+            point = node.old + (node - node.old) * (oldheight / (oldheight - height))
+            side = 1 if oldheight >= 0 else -1
+        elif abs(height) < self.radius:
+            # The node is touching the plane. Uses the point on the plane under the node
+            point = node - normal * height
+            side = 1 if height >= 0 else -1
+        else:
+            return
 
+        # Checks to see if the point is inside the triangle (not just the plane). It has to be on the inside of all three sides
+        for start, end in [(face.first, face.second), (face.second, face.third), (face.third, face.first)]:
+            edge = Vectors.Vector3d.returnCrossProduct(end - start, point - start)
+            if Vectors.Vector3d.dotProduct(edge, normal) < 0:
+                return
+
+        # The face moves as much as its average w value allows
+        facew = (face.first.w + face.second.w + face.third.w) / 3
+        if node.w + facew == 0:
+            return
+
+        # Pushes the node out of the side of the face it came from, and the face the other way
+        offset = normal * ((side * self.radius - height) / (node.w + facew))
+        node.addScaled(offset, node.w)
+        for corner in face:
+            corner.subScaled(offset, facew * corner.w)
+        self.wake(face.first)
+
+        self.collide(((node - node.old) - (face.first - face.first.old)).length(), node)
 
     # Loops through every point and moves it
+    # The maths is done in place by Verlet.integrate, so no vectors are made for every node
     def movepoints(self):
+        fastest = 0
+        friction, grav = self.friction, self.grav
         for object in self.objects:
-            for point in object:
+            for point in self.awake(object)[0]:
                 # Gets the vector from the old pos to the new pos
                 # Multiplies it by the friction value to act as air resistance and friction
-                velocity = (point - point.old) * self.friction
-                self.evManager.push(MoveEvent(velocity.length()))
                 # Sets the new old position the current new position
-                point.old = Vectors.Vector3d(*point.list())
-
                 # Gets the new position. Adds the gravity vector and mulplies by the nodes w value
                 # A W value of 1 means that the point is normal and acts normally
                 # A W value of 0 means that the point is 'pinned' and can't move
-                newposition = point + (velocity + self.grav) * point.w
+                speed = point.integrate(friction, grav)
+                if speed > fastest:
+                    fastest = speed
 
-                # Sets the new node position
-                point.x = newposition.x
-                point.y = newposition.y
-                point.z = newposition.z
+        # Speeds are compared squared, so only the fastest one needs to be square rooted
+        self.frame.speed = max(self.frame.speed, math.sqrt(fastest))
 
     # Loops through every edge and moves the edges nodes around so they arn't too close or too far away
+    # Returns how far off the worst stick was, as a fraction of its length
     def movesticks(self):
+        residual = 0
         for object in self.objects:
-            for edge in object.edges:
+            for edge in self.awake(object)[1]:
                 # Gets the difference from the ideal distance between nodes and the actual distance between nodes
-                rel = edge.first - edge.second
-                distance = rel.length()
-
-                # Negative means the points are too far awy, Positive means they are too close
-                difference = edge.length - distance
-
-                # Gets the percent of the distance each node has to move for them to be edge.length away
-                try:
-                    percent = difference / distance / 2
-                except:
-                    percent = 0.5
-
-                # Gets the distance each node has to move
-                offset = rel * percent
-
-                # Moves each node into place. Multiplies by the w value so that "pinned" points don't move
+                # and moves each node half of it. Multiplies by the w value so that "pinned" points don't move
                 # While this means that a node will only move half the distance required if the other node is pinned,
-                # this calculation happens Constants.PHY_PRECISION times, so its gets closer every calculation
-                edge.first.add(offset * edge.first.w)
-                edge.second.sub(offset * edge.second.w)
+                # this calculation happens more than once a frame, so its gets closer every calculation
+                error = edge.first.relax(edge.second, edge.length)
+                if error > residual:
+                    residual = error
+        return residual
+
+    # Returns the edges of an object in the order they should be solved
+    def sticks(self, object):
+        if self.solver == 'colour':
+            return object.colourOrder()
+        return object.edges
 
     def notify(self, event):
         pass
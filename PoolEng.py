@@ -0,0 +1,240 @@
+import os
+import mmap
+import time
+import multiprocessing
+import warnings
+import weakref
+import Constants
+import PhysEng
+import ArrayEng
+from ArrayEng import np, integrate, relax, clamp
+
+# A version of the ArrayEngine that simulates separate wireframes at the same time, in separate processes.
+# Wireframes in the engine never touch each other (unless collisions are on), so each one can be stepped on its own.
+# Threads can't do this, since most of the work is done by Python between the numpy calls, and only one thread
+# can run Python at a time.
+
+# The positions, old positions and w values of every wireframe are moved into memory shared with the worker processes,
+# so the nodes the game and renderer use are the same ones the workers move, and nothing is copied between them.
+# Every step the engine writes the settings into shared memory, starts every worker, and waits for all of them to finish.
+
+# Scenes with one wireframe, or with collisions on, just run like the ArrayEngine.
+# The workers are forked, so this also only works where processes can be forked (not on Windows).
+# Anywhere else it runs like the ArrayEngine too
+
+# If a worker dies (an error while stepping, or the system killing it), the engine notices straight away, warns, and
+# runs like the ArrayEngine from then on. So does a worker that takes longer than PHY_PROCESS_TIMEOUT seconds to step.
+# The workers aren't synchronised with a multiprocessing Barrier, since a Barrier waits forever for processes that were killed
+
+# How often (in seconds) the engine checks the workers are still alive while it waits for them
+POLL = 0.05
+
+# The settings written for the workers before every step
+SETTINGS = ['friction', 'gravx', 'gravy', 'gravz', 'boxx', 'boxy', 'boxz', 'bounce', 'precision', 'tolerance', 'limit', 'stop']
+
+# What the workers write back for each wireframe. active is written by the engine, and is 0 if the wireframe is asleep
+RESULTS = ['active', 'speed', 'impact', 'collisions', 'iterations', 'residual']
+
+
+# Makes an array in memory that forked processes share (instead of getting their own copy)
+def shared(shape, dtype=float):
+    size = int(np.prod(shape)) * np.dtype(dtype).itemsize
+    return np.frombuffer(mmap.mmap(-1, max(size, 1)), dtype, int(np.prod(shape))).reshape(shape)
+
+
+# Moves the positions, old positions and w values of a wireframe into shared memory
+def share(wireframe):
+    buffer = wireframe.buffer
+    for name in ('pos', 'old', 'w'):
+        array = getattr(buffer, name)
+        copy = shared(array.shape)
+        copy[:] = array
+        setattr(buffer, name, copy)
+
+    # The nodes still point to rows of the old arrays
+    for node in wireframe.nodes:
+        node.row = buffer.pos[node.index]
+        node.oldrow = buffer.old[node.index]
+
+
+# Steps one wireframe. Does the same maths as the ArrayEngine, in the same order, so the results match
+def stepObject(settings, result, pos, old, w, hits, levels):
+    friction, gravx, gravy, gravz, boxx, boxy, boxz, bounce, precision, tolerance, limit, stop = settings.tolist()
+    hits[:] = 0
+    if not result[0] or not len(pos):
+        result[1:] = 0
+        return
+
+    velocity = integrate(pos, old, w, friction, np.array([gravx, gravy, gravz]))
+    speed = float(np.sqrt(velocity[:, 0] ** 2 + velocity[:, 1] ** 2 + velocity[:, 2] ** 2).max())
+
+    # Each wireframe stops solving its sticks on its own, when a tolerance is used
+    box = np.array([boxx, boxy, boxz])
+    impact = collisions = iterations = 0
+    while True:
+        residual = relax(pos, w, levels)
+        hit, speeds = clamp(pos, old, box, bounce)
+        if len(hit):
+            np.add.at(hits, hit, 1)
+            impact = max(impact, float(speeds.max()))
+            collisions += len(hit)
+        iterations += 1
+        if PhysEng.finished(iterations, residual, precision, tolerance, limit):
+            break
+
+    result[1:] = (speed, impact, collisions, iterations, residual)
+
+
+# Raised when the worker processes stop answering
+class PoolError(RuntimeError):
+    pass
+
+
+# What each worker process runs. Steps its wireframes every time the engine starts it, then tells the engine it is done.
+# Waits for the engine as long as it takes, since the game can stop stepping for any amount of time,
+# but stops if the engine's process has gone. An error ends the process, which the engine notices (see Pool.wait)
+def work(settings, results, jobs, start, done, parent):
+    while True:
+        while not start.acquire(timeout=1):
+            if os.getppid() != parent:
+                return
+        if settings[-1]:
+            return
+        for index, pos, old, w, hits, levels in jobs:
+            stepObject(settings, results[index], pos, old, w, hits, levels)
+        done.release()
+
+
+# The worker processes, and the shared memory they use
+class Pool:
+    def __init__(self, objects, buffers, solver, processes, timeout):
+        self.key = [(id(object), id(buffer)) for object, buffer in zip(objects, buffers)]
+        self.timeout = timeout # Seconds to wait for the workers before giving up on them
+        self.settings = shared(len(SETTINGS))
+        self.results = shared((len(objects), len(RESULTS)))
+
+        # The w values the workers use, with sleeping islands pinned (see ArrayEngine.weights),
+        # and how many times each node hit a wall
+        self.weights = [shared(buffer.w.shape) for buffer in buffers]
+        self.hits = [shared(buffer.w.shape) for buffer in buffers]
+
+        # Gives each wireframe to the process with the least work so far, biggest wireframes first
+        jobs = [[] for i in range(min(processes, len(objects)))]
+        load = [0] * len(jobs)
+        for index in sorted(range(len(objects)), key=lambda index: -len(buffers[index].edges)):
+            share(objects[index])
+            buffer = buffers[index]
+            i = load.index(min(load))
+            jobs[i].append((index, buffer.pos, buffer.old, self.weights[index], self.hits[index], buffer.levels(solver)))
+            load[i] += len(buffer.edges) + len(buffer)
+
+        # Each worker has its own semaphore the engine starts it with, and they all share one to say they are done
+        context = multiprocessing.get_context('fork')
+        self.starts = [context.Semaphore(0) for job in jobs]
+        self.done = context.Semaphore(0)
+        self.processes = [context.Process(target=work, args=(self.settings, self.results, job, start, self.done, os.getpid()), daemon=True)
+                          for job, start in zip(jobs, self.starts)]
+        for process in self.processes:
+            process.start()
+
+    # Waits for every worker to finish its step.
+    # Raises a PoolError if a worker stops running, or they take longer than the timeout
+    def wait(self):
+        deadline = time.monotonic() + self.timeout
+        for i in range(len(self.processes)):
+            while not self.done.acquire(timeout=POLL):
+                if any(process.exitcode is not None for process in self.processes) or time.monotonic() > deadline:
+                    processes = self.processes
+                    self.close(POLL)
+                    raise PoolError('The worker processes stopped answering (exit codes {})'.format([process.exitcode for process in processes]))
+
+    # Runs one step on every wireframe, and returns what happened to each one
+    def step(self, settings, weights):
+        self.settings[:] = settings
+        for result, copy, w in zip(self.results, self.weights, weights):
+            result[0] = w is not None
+            if w is not None:
+                copy[:] = w
+
+        for start in self.starts:
+            start.release()
+        self.wait()
+        return self.results
+
+    # Stops the workers. Workers that haven't stopped within the timeout are ended
+    def close(self, timeout=None):
+        if not self.processes:
+            return
+        self.settings[-1] = 1
+        for start in self.starts:
+            start.release()
+        for process in self.processes:
+            process.join(self.timeout if timeout is None else timeout)
+            if process.is_alive():
+                process.terminate()
+                process.join()
+        self.processes = []
+
+
+class PoolEngine(ArrayEng.ArrayEngine):
+    def __init__(self, objects, friction, box, **kwargs):
+        # How many processes to use. 0 uses one for every core
+        self.processes = kwargs.get('processes', Constants.PHY_PROCESSES) or multiprocessing.cpu_count()
+        self.timeout = kwargs.get('timeout', Constants.PHY_PROCESS_TIMEOUT)
+        self.workers = None # The Pool of worker processes, once they have been started
+        super().__init__(objects, friction, box, **kwargs)
+
+    # Whether the wireframes are stepped in separate processes
+    def parallel(self):
+        return (self.processes > 1 and len(self.objects) > 1 and not self.collisions
+                and 'fork' in multiprocessing.get_all_start_methods())
+
+    # Starts the worker processes, or starts them again if the wireframes have changed
+    def start(self, buffers):
+        if self.workers is not None and self.workers.key == [(id(object), id(buffer)) for object, buffer in zip(self.objects, buffers)]:
+            return self.workers
+        self.stop()
+        self.workers = Pool(self.objects, buffers, self.solver, self.processes, self.timeout)
+        self.closer = weakref.finalize(self, self.workers.close)
+        return self.workers
+
+    # Stops the worker processes
+    def stop(self):
+        if self.workers is not None:
+            self.closer()
+            self.workers = None
+
+    # Stops the worker processes, and the threads the ArrayEngine uses
+    def close(self):
+        self.stop()
+        super().close()
+
+    def step(self):
+        if not self.parallel():
+            self.stop()
+            return super().step()
+
+        buffers = list(self.buffers())
+        pool = self.start(buffers)
+        settings = [self.friction, *self.grav, *self.box, Constants.PHY_BOUNCE, self.precision, self.tolerance, self.limit, 0]
+        try:
+            results = pool.step(settings, [self.weights(object, buffer) for object, buffer in zip(self.objects, buffers)])
+        except PoolError as error:
+            # Carries on in this process. Wireframes the dead worker hadn't stepped yet miss this step
+            warnings.warn('{}. Stepping every wireframe in this process from now on'.format(error), RuntimeWarning)
+            self.stop()
+            self.processes = 1
+            return
+
+        self.frame.speed = max(self.frame.speed, float(results[:, 1].max()))
+        self.iterations = int(results[:, 4].max())
+        self.residual = float(results[:, 5].max())
+
+        # Goes through the wall hits like the other engines do, so they end up in the frame and wake sleeping islands
+        for object, result, hits in zip(self.objects, results, pool.hits):
+            if result[3]:
+                self.frame.impact = max(self.frame.impact, float(result[2]))
+                self.frame.collisions += int(result[3])
+                nodes = [object.nodes[index] for index in np.repeat(np.arange(len(hits)), hits.astype(int))]
+                self.frame.hits.extend(nodes)
+                self.wake(*nodes)
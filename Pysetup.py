@@ -4,16 +4,22 @@ from Wireframe import *
 import Renderer
 import math
 import PhysEng
+import ArrayEng
+import PoolEng
 import random
 from Events import *
 from Renderer import *
 from gui import *
 from Features import *
-import pickle
-from Constants import *
+import Scene
+import Constants
 from Colour import *
 from functools import partial
 
+# Creates the window, sounds and achievement trackers before anything uses them
+Constants.init()
+from Constants import *
+
 LOOKSPEED = 0.05 # How fast you turn when looking around
 MOVESPEED = 1    # How fast you move
 
@@ -21,10 +27,10 @@ MOVESPEED = 1    # How fast you move
 pygame.display.set_caption('PHY PY')
 pygame.display.set_icon(pygame.image.load('Circle.png'))
 clock = pygame.time.Clock()
-pygame.mixer.pre_init(44100, -16, 1, 512)
-pygame.init()
 
 class Game:
+    events = (KeyEvent, TickEvent, StepEvent, RenderEvent, MouseClick)
+
     @EventAdder
     def __init__(self, box, wireframes, screen, **kwargs):
         fov = 60 # Fov used when created
@@ -93,7 +99,14 @@ class Game:
         # Create the objects the game uses
         self.camera = Camera(fov, Vector3d(box.x / 2, box.y / 2, -80), screen)
         self.screen = Screen(self.camera, screen, self.box)
-        self.world = PhysEng.Engine([], 0.99, box, evManager=self.evManager)
+        # Uses the array backed engine if it is turned on (and numpy is installed)
+        # Separate wireframes are stepped in separate processes if that is turned on too
+        if PHY_ARRAYS and ArrayEng.np:
+            engine = ArrayEng.ArrayEngine if PHY_PROCESSES == 1 else PoolEng.PoolEngine
+            self.world = engine([], 0.99, box, solver=PHY_ARRAY_SOLVER, threads=PHY_THREADS, collisions=PHY_COLLIDE, processes=PHY_PROCESSES,
+                                interpolate=PHY_INTERPOLATE, evManager=self.evManager)
+        else:
+            self.world = PhysEng.Engine([], 0.99, box, solver=PHY_SOLVER, collisions=PHY_COLLIDE, interpolate=PHY_INTERPOLATE, evManager=self.evManager)
         self.screen.additem(*wireframes)
 
     def run(self):
@@ -104,6 +117,8 @@ class Game:
         # Rotates the camera
         self.camera.look = (self.view_adder.x, self.view_adder.y, 0)
 
+    # Runs one fixed step of the simulation. This can happen more than once a frame, or not at all (see FixedStep)
+    def step(self):
         if self.state == 1:
             if self.holder:
                 # updates the 3d position the mouse is holding, using the current position as a bearing
@@ -117,7 +132,7 @@ class Game:
     def save(self, text):
         # Saves the wireframe
         try:
-            pickle.dump(self.wireframes[0], open(text, 'wb'))
+            Scene.save(self.wireframes[0], text)
         except:
             # Notifies the player that the file name to save was invalid.
             SOUND_ERROR.play()
@@ -133,8 +148,15 @@ class Game:
 
     def load(self, text):
         try:
-            # Loads wireframe
-            self.wireframes[0] = pickle.load(open(text, 'rb'))
+            # Loads wireframe. The array engine can use the nodes straight from a memory mapped file
+            if isinstance(self.world, ArrayEng.ArrayEngine):
+                self.wireframes[0] = Scene.loadMapped(text)
+            else:
+                self.wireframes[0] = Scene.load(text)
+        except ValueError:
+            # Old pickled scenes (and any other file) aren't loaded, since unpickling a file can run code that was put in it
+            SOUND_ERROR.play()
+            globalTimer.registerItem(TextBoxEvent.from_text(Vectors.Vector2d(64, 64), 'The file {} is not a scene'.format(text), gameDisplay, evManager=self.evManager), 60)
         except:
             # Notfies the player that the file doesnt exist if the game was unable to load the file
             SOUND_ERROR.play()
@@ -309,17 +331,29 @@ class Game:
             self.run()
 
             # Lets go of a node the player is holding if the x position of the mouse
-            # enters into the side bar
+            # enters into the side bar. This is input, so it is checked every frame, even ones without a step
             if pygame.mouse.get_pos()[0] >= 600:
                 if self.holder:
                     self.holder.w = self.holdermem
+                    self.world.wake(self.holder)
                     self.holder = False
 
+        # Only the physics runs in fixed steps
+        elif isinstance(event, StepEvent):
+            self.step()
+
         elif isinstance(event, RenderEvent):
+            # Draws the simulation in between its last two steps, so it moves smoothly
+            if self.state == 1:
+                self.world.blend(event.alpha)
+
             # Renders grid if the state is equal to 0
             # Draws the nodes that the player has selected
             self.screen.render(self.state == 0, self.build)
 
+            if self.state == 1:
+                self.world.restore()
+
         elif isinstance(event, MouseClick):
             # Game is in simulation mode
             if self.state == 1:
@@ -342,6 +376,7 @@ class Game:
                         if self.holder:
                             # Sets the w attribute of the node to it's original value
                             self.holder.w = self.holdermem
+                            self.world.wake(self.holder)
 
                             self.holder = False
             else:
@@ -466,11 +501,17 @@ STATE_ITEMS[2].append(Button('BACK', partial(change_state, 0), gameDisplay, evMa
 # Sets the state
 change_state(0)
 
+# Runs the physics at a fixed rate, however fast frames are drawn
+stepper = FixedStep(PHY_TIMESTEP, PHY_MAX_SUBSTEPS)
+
 # Game loop
 while True:
     # Pushes events so that objects registered react
+    # Runs as many physics steps as the time since the last frame needs
+    for i in range(stepper.advance(clock.get_time() / 1000)):
+        Controller.push(StepEvent())
     Controller.push(TickEvent())
-    Controller.push(RenderEvent())
+    Controller.push(RenderEvent(stepper.alpha))
 
     pygame.display.update()
     clock.tick(60)
@@ -1,5 +1,4 @@
 from Wireframe import *
-import pygame
 from Vectors import *
 import math
 from Events import *
@@ -7,31 +6,238 @@ import Constants
 from math import sin, cos
 from statistics import median
 
+# numpy is optional. Without it renderPoints projects the points one at a time
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
 # Defines some colours used by the renderer
 BLUE = (0, 55, 220)
 RED = (220, 55, 0)
 AQUA = (0, 190, 255)
 ORANGE = (255, 180, 0)
 
-def getall(classes, *vars):
-    # Returns a list of every value of a attribute on a list of classes
-    # Also allows for multiple attributes to be passed in
-    total = []
-    for clas in classes:
-        for var in vars:
-            total.extend(getattr(clas, var))
-    return total
+PICK_RADIUS = 10 # How close (in pixels) the mouse has to be to a node to select it
+CULL_MARGIN = 5  # How far (in pixels) past the edge of the screen something has to be before it isn't drawn. Nodes are circles, so they poke in a bit
+
+# A grid over the screen, used to quickly find the node closest to the mouse.
+# Each projected node is put in the square of the grid it lands in, so finding the closest node only means
+# looking through the squares around the mouse instead of every node.
+class PickGrid:
+    def __init__(self, size, key):
+        self.size = size  # The width and height of each square in pixels
+        self.key = key    # What the grid was built from. Used to tell if it is out of date
+        self.cells = {}
+
+    def add(self, point, node):
+        cell = (int(point.x // self.size), int(point.y // self.size))
+        self.cells.setdefault(cell, []).append((point, node))
+
+    def closest(self, point, radius):
+        # Returns the closest node within radius pixels of the point, or False if there isn't one
+        highest = [radius, False]
+        reach = int(radius // self.size) + 1
+        cellx = int(point.x // self.size)
+        celly = int(point.y // self.size)
+        for x in range(cellx - reach, cellx + reach + 1):
+            for y in range(celly - reach, celly + reach + 1):
+                for proj, node in self.cells.get((x, y), ()):
+                    dist = Vector2d.distance(proj, point)
+                    if dist < highest[0]:
+                        highest = [dist, node]
+        return highest[1]
+
+# Everything the screen draws, sorted furthest from the camera first, so closer things are drawn over them.
+# The list is only made again when something is added to or removed from it. Every frame the distances are worked
+# out all at once from the middle of every item, and the order from the last frame is sorted again. Things barely
+# move between frames, so that order is almost sorted already, which the sort is very quick at.
+# Before sorting, everything that can't be seen is culled (see cull), so it is neither sorted nor drawn
+class RenderList:
+    def __init__(self):
+        self.key = None
+        self.items = []       # Every node, edge and face
+        self.nodes = []       # Every node the items use
+        self.positions = []   # Where each of those nodes is this frame (see locate)
+        self.pickable = set() # The ids of the nodes that can be clicked on
+        self.corners = []     # For nodes, edges and faces: where they are in items, and the indices of their nodes
+        self.wireframes = []  # For each wireframe: where its items start and end, where its faces start, and the indices of its nodes and face corners
+        self.order = None     # The order the items were drawn in last frame
+
+    # Makes the list again if the key has changed.
+    # The nodes, edges and faces of every wireframe are drawn, then the others. The nodes of pickable can be clicked on
+    def update(self, key, wireframes, others, pickable):
+        if key == self.key:
+            return
+        self.key = key
+        self.items = []
+        places = []
+        for wireframe in wireframes:
+            start = len(self.items)
+            self.items.extend(wireframe.nodes)
+            self.items.extend(wireframe.edges)
+            faces = len(self.items)
+            self.items.extend(wireframe.faces)
+            places.append((wireframe, start, faces, len(self.items)))
+        self.items.extend(others)
+        self.pickable = set(id(node) for wireframe in pickable for node in wireframe)
+
+        index = {}
+        self.nodes = []
+        kinds = {1: ([], []), 2: ([], []), 3: ([], [])}
+        for i, item in enumerate(self.items):
+            if isinstance(item, Vectors.Vector3d):
+                corners = [item]
+            elif isinstance(item, (Edge, Face)):
+                corners = list(item)
+            else:
+                continue
+            for node in corners:
+                if id(node) not in index:
+                    index[id(node)] = len(self.nodes)
+                    self.nodes.append(node)
+            kinds[len(corners)][0].append(i)
+            kinds[len(corners)][1].append([index[id(node)] for node in corners])
+
+        self.corners = [(slots, indices) for slots, indices in kinds.values() if slots]
+        self.wireframes = [(wireframe, start, faces, end, [index[id(node)] for node in wireframe.nodes],
+                            [[index[id(node)] for node in face] for face in wireframe.faces])
+                           for wireframe, start, faces, end in places]
+        if np is not None:
+            self.corners = [(np.array(slots), np.array(indices)) for slots, indices in self.corners]
+            self.wireframes = [(wireframe, start, faces, end, np.array(nodes, dtype=int), np.array(corners, dtype=int).reshape(-1, 3))
+                               for wireframe, start, faces, end, nodes, corners in self.wireframes]
+        self.order = None
+
+    # Reads where every node is this frame. Everything else the list works out this frame uses these positions
+    def locate(self):
+        self.positions = [(node.x, node.y, node.z) for node in self.nodes]
+        if np is not None:
+            self.positions = np.array(self.positions, dtype=float).reshape(-1, 3)
+        return self.positions
+
+    # Works out which items can't be seen this frame. screen and visible are where every node lands on the screen
+    # (from Camera.renderPoints). Returns an array that is True for every item that should be drawn, and how many
+    # items were culled by each test:
+    #   wireframes  Items of wireframes whose bounding sphere is completely outside the view of the camera
+    #   frustum     Nodes, edges and faces that are behind the camera, or completely off one side of the screen
+    #   backfaces   Faces on the back of closed wireframes, when backfaces is True (see Wireframe.windings)
+    # Nothing here changes how anything looks: culled items would have been drawn off the screen, or under other faces.
+    # Needs numpy. Without it nothing is culled, and returns None
+    def cull(self, camera, screen, visible, backfaces=False):
+        culled = {'wireframes': 0, 'frustum': 0, 'backfaces': 0}
+        if np is None:
+            return None, culled
+
+        shown = np.ones(len(self.items), dtype=bool)
+        positions = self.positions
+        pos = np.array((camera.pos.x, camera.pos.y, camera.pos.z))
+        matrix = np.array(camera.view())
+
+        # Nodes are only put in the picking grid when they are drawn, so nodes close enough to the edge to be clicked on
+        # (PICK_RADIUS) are kept too
+        margin = max(CULL_MARGIN, PICK_RADIUS)
+
+        # The sides of the view go out from the camera. A point relative to the camera (x, y, z) is off the right of the
+        # screen (past the margin) when x > z * slope. The sphere is outside when its middle is further than its radius
+        # past one of the sides, or completely behind the camera
+        slopes = ((1 + margin / camera.woffset) / camera.ez, (1 + margin / camera.hoffset) / camera.ez)
+        for wireframe, start, faces, end, nodes, corners in self.wireframes:
+            if not len(nodes):
+                continue
+            points = positions[nodes]
+            middle = points.mean(axis=0)
+            radius = math.sqrt(((points - middle) ** 2).sum(axis=1).max())
+            x, y, z = (matrix @ (middle - pos)).tolist()
+            if z <= -radius or any((side - slope * z) / math.sqrt(1 + slope ** 2) > radius
+                                   for side, slope in ((x, slopes[0]), (-x, slopes[0]), (y, slopes[1]), (-y, slopes[1]))):
+                shown[start:end] = False
+                culled['wireframes'] += end - start
+
+        # Gives every node a bit for each side of the screen it is past, and one for being behind the camera.
+        # An item is culled if all its nodes are past the same side, or any of them is behind the camera (like the
+        # drawing used to skip them). Points behind the camera are put at 0, 0, so they never get a side bit
+        x, y = screen[:, 0], screen[:, 1]
+        codes = np.zeros(len(self.nodes), dtype=np.uint8)
+        for bit, outside in enumerate((~visible, x < -margin, x > 2 * camera.woffset + margin,
+                                       y < -margin, y > 2 * camera.hoffset + margin)):
+            codes |= outside.astype(np.uint8) << bit
+        for slots, indices in self.corners:
+            live = slots[shown[slots]]
+            corner = codes[indices[shown[slots]]]
+            gone = (np.bitwise_and.reduce(corner, axis=1) != 0) | ((np.bitwise_or.reduce(corner, axis=1) & 1) != 0)
+            shown[live[gone]] = False
+            culled['frustum'] += int(gone.sum())
+
+        # Faces pointing away from the camera, on wireframes that are closed so their back can't be seen
+        if backfaces:
+            for wireframe, start, faces, end, nodes, corners in self.wireframes:
+                signs = wireframe.windings() if len(corners) else None
+                if signs is None:
+                    continue
+                first, second, third = positions[corners[:, 0]], positions[corners[:, 1]], positions[corners[:, 2]]
+                normals = np.cross(second - first, third - first) * np.array(signs)[:, None]
+                gone = shown[faces:end] & (((pos - first) * normals).sum(axis=1) <= 0)
+                shown[faces:end][gone] = False
+                culled['backfaces'] += int(gone.sum())
+
+        return shown, culled
+
+    # Returns how far (squared) the middle of every item is from a point
+    def distances(self, point):
+        positions = self.positions
+        if np is None:
+            keys = [0] * len(self.items)
+            for slots, indices in self.corners:
+                for slot, corners in zip(slots, indices):
+                    middle = [sum(positions[i][axis] for i in corners) / len(corners) for axis in range(3)]
+                    keys[slot] = (middle[0] - point.x) ** 2 + (middle[1] - point.y) ** 2 + (middle[2] - point.z) ** 2
+            return keys
+
+        keys = np.zeros(len(self.items))
+        for slots, indices in self.corners:
+            middle = positions[indices[:, 0]]
+            for column in range(1, indices.shape[1]):
+                middle = middle + positions[indices[:, column]]
+            if indices.shape[1] > 1:
+                middle = middle / indices.shape[1]
+            keys[slots] = ((middle - (point.x, point.y, point.z)) ** 2).sum(axis=1)
+        return keys
+
+    # Returns the items, furthest from the point first.
+    # Items the same distance away stay in the order they were in last frame.
+    # If shown is given (see cull), only the items it shows are sorted and returned. The others keep their place in the
+    # order, so they are almost in the right place when they come back into view
+    def sorted(self, point, shown=None):
+        keys = self.distances(point)
+        if np is None:
+            self.order = list(self.order or range(len(self.items)))
+            self.order.sort(key=keys.__getitem__, reverse=True)
+            return [self.items[i] for i in self.order]
+
+        order = np.arange(len(self.items)) if self.order is None else self.order
+        live = np.ones(len(order), dtype=bool) if shown is None else shown[order]
+        drawn = order[live]
+        # A stable sort on numbers is a timsort, which is quick on lists that are almost sorted
+        drawn = drawn[np.argsort(-keys[drawn], kind='stable')]
+        order[live] = drawn
+        self.order = order
+        return [self.items[i] for i in drawn]
+
 
 # The screen class. Keeps a list of wireframes, then returns information about those wireframes
 # Like closest node to a point, closest 3d point to a point, etc
 # Can render its wireframes as well
 
 class Screen:
-    def __init__(self, camera, display, box):
+    def __init__(self, camera, display, box, **kwargs):
         self.camera = camera
         self.display = display
         self.box = box
 
+        # Whether faces on the back of closed wireframes are drawn (see RenderList.cull)
+        self.backfaces = kwargs.get('backfaces', Constants.REND_BACKFACES)
+
         # The box that shows the boundaries of the simulation.
         # Cannot be interacted with. Just renders
         self.renderbox = Wireframe()
@@ -42,34 +248,92 @@ class Screen:
         # The grid that shows where nodes can be created
         self.grid = Wireframe()
         self.grid.addNodes(*[Verlet(x, y, z, 0) for x in range(0, box.x + 1, Constants.REND_PREC) for y in range(0, box.y + 1, Constants.REND_PREC) for z in range(0, box.z + 1, Constants.REND_PREC)])
+        self.gridnodes = set(id(node) for node in self.grid.nodes) # The grid never changes, so this is only made once
 
         self.items = []
 
+        # The grid of projected nodes used by closest. It is built while rendering, so the nodes don't have to be
+        # projected again when the mouse is clicked
+        self.picker = False
+
+        self.renderlist = RenderList()
+        self.culled = {'wireframes': 0, 'frustum': 0, 'backfaces': 0} # How many items weren't drawn last frame, and why
+
+        # Where every node projected this frame landed on the screen (see project)
+        # Nodes move between frames, so it is emptied every time the screen is rendered, or the camera changes
+        self.frame = 0
+        self.projections = {}
+        self.projectionKey = None
+
     def additem(self, *items):
         for item in items:
             self.items.append(item)
 
-    def closest(self, point):
-        # Returns the closest node to the point.
-        # If no node is found within 10 pixel, False is returned
-        highest = [10, False]
-        for item in self.items:
-            for node in item:
+    def pickKey(self):
+        # Changes whenever the items that can be picked change
+        return id(self.items), tuple((id(item), item.version) for item in self.items)
 
-                # Gets the 2d representation of the node
-                proj = self.camera.renderP(node)
-                if not proj:
-                    continue
+    def buildPicker(self):
+        # Builds the grid of projected nodes from scratch.
+        # Only used if nothing has been rendered since the items changed
+        self.picker = PickGrid(PICK_RADIUS, self.pickKey())
+        for item in self.items:
+            for node, point in zip(item.nodes, self.project(item.nodes)):
+                if point:
+                    self.picker.add(Vector2d(*point), node)
 
-                # Gets the distance from the 2d representation of the node and the point passed to the method
-                # Then checks to see if its closest node found to the point
-                dist = Vector2d.distance(proj, point)
-                if dist < highest[0]:
+    def closest(self, point):
+        # Returns the closest node to the point.
+        # If no node is found within PICK_RADIUS pixels, False is returned
+        # Uses the grid built in the last frame, which holds the nodes where they were drawn on the screen
+        if not self.picker or self.picker.key != self.pickKey():
+            self.buildPicker()
+        return self.picker.closest(point, PICK_RADIUS)
+
+
+    # Returns where each node lands on the screen, as an x, y tuple, or False if it is behind the camera.
+    # Each node is only projected once a frame, however many edges, faces and clicks ask for it.
+    # Nodes that only exist for a moment should use remember=False, since the projections are looked up by id
+    def project(self, nodes, remember=True):
+        if not remember:
+            screen, visible = self.camera.renderPoints(nodes)
+            return [(x, y) if seen else False for (x, y), seen in zip(screen, visible)]
+
+        self.camera.view() # Updates the camera version if it has changed
+        if self.projectionKey != (self.frame, self.camera.version):
+            self.projectionKey = (self.frame, self.camera.version)
+            self.projections = {}
+
+        projections = self.projections
+        missing = [node for node in nodes if projections.get(id(node), (None,))[0] is not node]
+        if missing:
+            self.remember(missing, *self.camera.renderPoints(missing))
+        return [projections[id(node)][1] for node in nodes]
+
+    # Keeps where some nodes were projected this frame (from Camera.renderPoints), so project doesn't do it again.
+    # The node is kept with its projection, so a new node that gets the id of an old one isn't mixed up with it
+    def remember(self, nodes, screen, visible):
+        self.camera.view()
+        if self.projectionKey != (self.frame, self.camera.version):
+            self.projectionKey = (self.frame, self.camera.version)
+            self.projections = {}
+
+        if np is not None and isinstance(screen, np.ndarray):
+            screen, visible = screen.tolist(), visible.tolist()
+        projections = self.projections
+        for node, (x, y), seen in zip(nodes, screen, visible):
+            projections[id(node)] = (node, (x, y) if seen else False)
+
+    # Returns the node that lands closest to a point on the screen, or False if they are all behind the camera
+    def nearest(self, nodes, projections, point):
+        highest = [False, False]
+        for node, proj in zip(nodes, projections):
+            if proj:
+                dist = math.hypot(proj[0] - point.x, proj[1] - point.y)
+                if highest[1] is False or dist < highest[0]:
                     highest = [dist, node]
-
         return highest[1]
 
-
     def get3dPoint(self, point, bearing):
         # Returns a 3d point, given a 2d point.
         # Does this by finding the closest 3d point when projected to a 2d point
@@ -77,66 +341,59 @@ class Screen:
 
         # If a bearing is present, 3d points are chosen around the bearing.
         if bearing:
-            # Works in the same way as the above method
-            highest = [False, False]
-            for node in [Vector3d(x, y, z) for x in range(int(bearing.x - 1), int(bearing.x + 2)) for y in range(int(bearing.y - 1), int(bearing.y + 2)) for z in range(int(bearing.z - 1), int(bearing.z + 2))]:
-                proj = self.camera.renderP(node)
-                dist = Vector2d.distance(proj, point)
-                if not highest[0] or dist < highest[0]:
-                    highest = [dist, node]
-
-            if highest[1] == False:
-                return False
-            else:
-                return highest[1]
+            nodes = [Vector3d(x, y, z) for x in range(int(bearing.x - 1), int(bearing.x + 2)) for y in range(int(bearing.y - 1), int(bearing.y + 2)) for z in range(int(bearing.z - 1), int(bearing.z + 2))]
+            return self.nearest(nodes, self.project(nodes, False), point)
 
         # Without a bearing the 3d points are chosen by going through the grid
-        else:
-            # Works in the same way as the above method
-            highest = [False, False]
-            for node in self.grid:
-                proj = self.camera.renderP(node)
-                if not proj:
-                    continue
-                dist = Vector2d.distance(proj, point)
-                if not highest[0] or dist < highest[0]:
-                    highest = [dist, node]
-
-            if highest[1] == False:
-                return False
-            else:
-                return highest[1]
+        return self.nearest(self.grid.nodes, self.project(self.grid.nodes), point)
 
     def render(self, grid, others):
         # Renders all the items to the screen
+        # pygame is imported here so that the camera maths can be used without loading it
+        import pygame
+
+        # Updates the list of all items that need to be rendered, if anything has been added or removed
+        wireframes = [self.renderbox] + self.items
+        extras = list(self.extras) + list(others)
+        key = (tuple((id(item), item.version) for item in wireframes), tuple(map(id, extras)), grid)
+        self.renderlist.update(key, wireframes, extras + self.grid.nodes if grid else extras, self.items)
+
+        # The nodes that can be clicked on get put in a new picking grid as they are drawn
+        self.picker = PickGrid(PICK_RADIUS, self.pickKey())
+        pickable = self.renderlist.pickable
+        if grid:
+            # The positions that already have a node, so grid nodes aren't drawn on top of them.
+            # The wireframes keep a dictionary of where their nodes are up to date themselves (see Wireframe.lookups),
+            # so only the few nodes that aren't in a wireframe are gone through
+            occupied = [item.lookups()[1] for item in self.items]
+            occupied.append(set(place(node) for node in self.renderbox.nodes + extras if isinstance(node, Vectors.Vector3d)))
 
-        # Creates a list of all items that need to be rendered
-        allitems = getall([self.renderbox], 'nodes', 'edges', 'faces')
-        allitems .extend(getall(self.items, 'nodes', 'edges', 'faces'))
-        allitems.extend(self.extras)
-        allitems.extend(others)
+        # Projects every node at once. The nodes have moved since the last frame, so nothing projected before is used
+        self.frame += 1
+        screen, visible = self.camera.renderPoints(self.renderlist.locate())
+        self.remember(self.renderlist.nodes, screen, visible)
+        projections = self.projections
 
-        dup = list(allitems) # duplicates items, to seperate the items from the grid that is going to be added to the orginal list
-        if grid:
-            gridnodes = getall([self.grid], 'nodes')
-            allitems.extend(gridnodes)
+        # Leaves out everything that can't be seen, before sorting what is left
+        shown, self.culled = self.renderlist.cull(self.camera, screen, visible, self.backfaces)
 
-        for item in sorted(allitems, key=lambda x:x.distance(self.camera.pos), reverse = True):
+        for item in self.renderlist.sorted(self.camera.pos, shown):
 
             # If the item is a node
             if isinstance(item, Vectors.Vector3d):
-                point = self.camera.renderP(item)
+                point = projections[id(item)][1]
+                if not point:
+                    continue
+                point = Vector2d(*point)
+                if id(item) in pickable:
+                    self.picker.add(point, item)
                 try:
                     # Checks to see if the node is part of the grid
-                    if any(id(item) == id(node) for node in self.grid):
+                    if id(item) in self.gridnodes:
 
                         # If the node is part of the grid, it only draws the node if
                         # there is no other node in that position
-                        for node in dup:
-                            if isinstance(node, Vectors.Vector3d):
-                                if (item.x, item.y, item.z) == (node.x, node.y, node.z):
-                                    break
-                        else:
+                        if not any(place(item) in positions for positions in occupied):
                             pygame.draw.circle(self.display, AQUA, (int(point.x), int(point.y)), 3)
                     else:
                         # Makes the node orange if its part of the extras list
@@ -155,21 +412,23 @@ class Screen:
 
             # If the item is an edge
             elif isinstance(item, Edge):
-                # projects each node from the edge, then draws a line connecting them
-                values = [self.camera.renderP(node) for node in item]
-                try:
-                    pygame.draw.line(self.display, item.colour, *[(int(point.x), int(point.y)) for point in values])
-                except:
-                    pass
+                # Gets where each node from the edge was projected, then draws a line connecting them
+                values = [projections[id(node)][1] for node in item]
+                if all(values):
+                    try:
+                        pygame.draw.line(self.display, item.colour, *[(int(x), int(y)) for x, y in values])
+                    except:
+                        pass
 
             # If the item is a face
             elif isinstance(item, Face):
                 # same process as with the edges
-                values = [self.camera.renderP(node) for node in item]
-                try:
-                    pygame.draw.polygon(self.display, item.colour, [(int(point.x), int(point.y)) for point in values])
-                except:
-                    pass
+                values = [projections[id(node)][1] for node in item]
+                if all(values):
+                    try:
+                        pygame.draw.polygon(self.display, item.colour, [(int(x), int(y)) for x, y in values])
+                    except:
+                        pass
 
 # The camera class.
 # This class was also designed to be versatile. Given a point, it performs a perspective projection on that point
@@ -192,6 +451,11 @@ class Camera(object):
         self.woffset = self.display.get_width() / 2
         self.hoffset = self.display.get_height() / 2
 
+        # The rotation matrix, worked out again whenever the camera moves, turns or zooms (see view)
+        self.key = None
+        self.matrix = None
+        self.version = 0 # Goes up every time the camera changes, so anything projected before can tell it is out of date
+
     @property
     def fov(self):
         return 2 * math.atan(1 / self.ez)
@@ -220,34 +484,63 @@ class Camera(object):
         if self.theta.y > math.pi:
             self.theta.y = -math.pi
 
-    def renderP(self, point):
-        # Takes a 3d vector, then projects it onto a 2d surface and returns the vector
-        try:
-            # follows the algorithm shown here https://en.wikipedia.org/wiki/3D_projection
-            relative = point - self.pos
-            rotated = Vector3d(0, 0, 0)
-
-            # Gets the relative z position of the node
-            rotated.z = cos(self.theta.x) * (cos(self.theta.y) * relative.z + sin(self.theta.y) * (sin(self.theta.z) * relative.y + cos(self.theta.z) * relative.x)) - sin(self.theta.x) * (cos(self.theta.z) * relative.y - sin(self.theta.z) * relative.x)
+    # Returns the rotation matrix of the camera. Each row turns a point (relative to the camera) into one axis of the
+    # cameras view: x is across the screen, y is down the screen and z is how far in front of the camera it is.
+    # The sines and cosines are only worked out again when the camera has changed
+    def view(self):
+        theta, pos = self.theta, self.pos
+        key = (theta.x, theta.y, theta.z, pos.x, pos.y, pos.z, self.ez, self.woffset, self.hoffset)
+        if key != self.key:
+            self.key = key
+            self.version += 1
 
-            # if the relative z position is less than zero, forces a return false
-            # (since the node is behind the camera and cannot be viewed)
-            if rotated.z <= 0:
-                raise ValueError
-
-            # Gets the relative x and y position
-            rotated.x = cos(self.theta.y) * (sin(self.theta.z) * relative.y + cos(self.theta.z) * relative.x) - sin(self.theta.y) * relative.z
-            rotated.y = sin(self.theta.x) * (cos(self.theta.y) * relative.z + sin(self.theta.y) * (sin(self.theta.z) * relative.y + cos(self.theta.z) * relative.x)) + cos(self.theta.x) * (cos(self.theta.z) * relative.y - sin(self.theta.z) * relative.x)
-
-            # Projects the new point onto a 2d surface
-            newx = (self.ez / rotated.z) * rotated.x * self.woffset + self.woffset
-            newy = (self.ez / rotated.z) * rotated.y * self.hoffset + self.hoffset
+            # follows the algorithm shown here https://en.wikipedia.org/wiki/3D_projection
+            sx, cx = sin(theta.x), cos(theta.x)
+            sy, cy = sin(theta.y), cos(theta.y)
+            sz, cz = sin(theta.z), cos(theta.z)
+            self.matrix = ((cy * cz, cy * sz, -sy),
+                           (sx * sy * cz - cx * sz, sx * sy * sz + cx * cz, sx * cy),
+                           (cx * sy * cz + sx * sz, cx * sy * sz - sx * cz, cx * cy))
+        return self.matrix
 
-            point = Vector2d(newx, newy)
-            return point
-        except:
+    def renderP(self, point):
+        # Takes a 3d vector, then projects it onto a 2d surface and returns the vector
+        # Returns False if the point is behind the camera (and cannot be viewed)
+        (xx, xy, xz), (yx, yy, yz), (zx, zy, zz) = self.view()
+        rx = point.x - self.pos.x
+        ry = point.y - self.pos.y
+        rz = point.z - self.pos.z
+
+        # Gets the relative z position of the node first, since nothing else is needed if it is behind the camera
+        z = zx * rx + zy * ry + zz * rz
+        if z <= 0:
             return False
 
+        # Projects the new point onto a 2d surface
+        scale = self.ez / z
+        return Vector2d(scale * (xx * rx + xy * ry + xz * rz) * self.woffset + self.woffset,
+                        scale * (yx * rx + yy * ry + yz * rz) * self.hoffset + self.hoffset)
+
+    # Projects lots of points at once. Takes an (N, 3) array of points (or a list of vectors or x, y, z tuples)
+    # Returns an (N, 2) array of screen positions, and an array that is True for every point in front of the camera.
+    # Points behind the camera are put at 0, 0
+    def renderPoints(self, points):
+        if np is None:
+            projected = [self.renderP(Vector3d(*point) if isinstance(point, tuple) else point) for point in points]
+            return [(point.x, point.y) if point else (0, 0) for point in projected], [bool(point) for point in projected]
+
+        if not isinstance(points, np.ndarray):
+            points = [point if isinstance(point, tuple) else (point.x, point.y, point.z) for point in points]
+        points = np.asarray(points, dtype=float).reshape(-1, 3)
+
+        rotated = (points - (self.pos.x, self.pos.y, self.pos.z)) @ np.array(self.view()).T
+        visible = rotated[:, 2] > 0
+        scale = self.ez / np.where(visible, rotated[:, 2], 1)
+        offset = (self.woffset, self.hoffset)
+        screen = rotated[:, :2] * scale[:, None] * offset + offset
+        screen[~visible] = 0
+        return screen, visible
+
     def move(self, move, strafe):
         # Moves the camera. move is how fast the camera should move forward (negative values move backwards)
         # strafe is how fast you camera should move to the right (negative values move the camera to the left)
@@ -0,0 +1,295 @@
+# Saves and loads wireframes as scene files.
+# Scene files used to be pickled Wireframe objects. Pickle files are big (every Verlet has a Vector3d inside it,
+# and every edge and face points to its nodes through pickle's memo), slow to load, and loading one can run any code
+# that was put in the file. A scene file is just numbers instead:
+
+#   A 24 byte header: the word PHYSCENE, the format version, and how many nodes, edges and faces there are
+#   Then these sections, one after the other. Each section starts on a multiple of 8 bytes, so they can be read
+#   straight out of the file as arrays:
+#       pos          x, y, z of every node                   (doubles)
+#       old          old x, y, z of every node               (doubles)
+#       w            w of every node                         (doubles)
+#       edges        the two node indices of every edge      (ints)
+#       lengths      the length of every edge                (doubles)
+#       edgecolours  r, g, b of every edge                   (floats)
+#       faces        the three node indices of every face    (ints)
+#       facecolours  r, g, b of every face                   (floats)
+# Everything is little endian.
+
+# Big scenes can also be memory mapped (see loadMapped), so only the parts of the file that get used are read.
+
+# Usage:
+#   python Scene.py FABRIC BABEL     Converts old pickled scene files to scene files, in place
+
+import os
+import sys
+import mmap
+import shutil
+import struct
+import pickle
+import operator
+from array import array
+from collections.abc import MutableSequence
+import Wireframe
+import ArrayEng
+
+MAGIC = b'PHYSCENE'
+VERSION = 1
+
+# Format version, flags (unused so far), nodes, edges, faces
+HEADER = struct.Struct('<8sHHIII')
+
+# Name, array typecode and how many values each node, edge or face has in each section, in the order they are stored
+SECTIONS = [('pos', 'd', 'nodes', 3),
+            ('old', 'd', 'nodes', 3),
+            ('w', 'd', 'nodes', 1),
+            ('edges', 'i', 'edges', 2),
+            ('lengths', 'd', 'edges', 1),
+            ('edgecolours', 'f', 'edges', 3),
+            ('faces', 'i', 'faces', 3),
+            ('facecolours', 'f', 'faces', 3)]
+
+# The numpy types of the array typecodes, used when memory mapping
+DTYPES = {'d': '<f8', 'i': '<i4', 'f': '<f4'}
+
+
+# Returns where each section is in a file: {name: (offset, typecode, how many values)}
+def layout(nodes, edges, faces):
+    counts = {'nodes': nodes, 'edges': edges, 'faces': faces}
+    sections = {}
+    offset = HEADER.size
+    for name, typecode, count, width in SECTIONS:
+        size = counts[count] * width
+        sections[name] = (offset, typecode, size)
+        offset += size * array(typecode).itemsize
+        offset += -offset % 8 # Pads to the next multiple of 8
+    return sections, offset
+
+
+# Reads the header of a scene. Raises a ValueError if the data isn't a scene (like an old pickled scene)
+def header(data):
+    if len(data) < HEADER.size or bytes(data[:8]) != MAGIC:
+        raise ValueError('Not a scene file')
+    magic, version, flags, nodes, edges, faces = HEADER.unpack_from(data)
+    if version > VERSION:
+        raise ValueError('Scene file is version {}, this game only knows up to version {}'.format(version, VERSION))
+    return nodes, edges, faces
+
+
+# Turns a wireframe into the bytes of a scene file
+def pack(wireframe):
+    nodes = wireframe.nodes
+    index = {id(node): i for i, node in enumerate(nodes)}
+
+    values = {'pos': [value for node in nodes for value in (node.x, node.y, node.z)],
+              'old': [value for node in nodes for value in (node.ox, node.oy, node.oz)],
+              'w': [node.w for node in nodes],
+              'edges': [index[id(node)] for edge in wireframe.edges for node in (edge.first, edge.second)],
+              'lengths': [getattr(edge, 'length', 0) for edge in wireframe.edges],
+              'edgecolours': [value for edge in wireframe.edges for value in edge.colour],
+              'faces': [index[id(node)] for face in wireframe.faces for node in face],
+              'facecolours': [value for face in wireframe.faces for value in face.colour]}
+
+    sections, size = layout(len(nodes), len(wireframe.edges), len(wireframe.faces))
+    data = bytearray(size)
+    HEADER.pack_into(data, 0, MAGIC, VERSION, 0, len(nodes), len(wireframe.edges), len(wireframe.faces))
+    for name, (offset, typecode, count) in sections.items():
+        part = array(typecode, values[name])
+        if sys.byteorder == 'big':
+            part.byteswap()
+        data[offset:offset + len(part) * part.itemsize] = part.tobytes()
+    return bytes(data)
+
+
+# Reads the sections of a scene file into arrays
+def sections(data):
+    counts = header(data)
+    places, size = layout(*counts)
+    if len(data) < size:
+        raise ValueError('Scene file is cut short')
+
+    parts = {}
+    for name, (offset, typecode, count) in places.items():
+        part = array(typecode)
+        part.frombytes(data[offset:offset + count * part.itemsize])
+        if sys.byteorder == 'big':
+            part.byteswap()
+        parts[name] = part
+    return parts
+
+
+# Splits a flat array into tuples of a certain size
+def groups(values, size):
+    return zip(*[iter(values)] * size)
+
+
+# Turns the colours in a file back into tuples. Most things share a few colours, so each colour is only made once.
+# Colours are saved as floats, so they are rounded back to the 2 decimal places the game uses for colours
+def palette(values):
+    colours = {}
+    for colour in groups(values, 3):
+        if colour not in colours:
+            colours[colour] = tuple(round(value, 2) for value in colour)
+        yield colours[colour]
+
+
+# Turns the bytes of a scene file back into a wireframe
+def unpack(data):
+    parts = sections(data)
+
+    # The nodes, edges and faces in a scene are already checked, so they don't go through addNodes, addEdges and addFaces
+    return Wireframe.Wireframe.from_arrays(list(groups(parts['pos'], 3)), list(groups(parts['edges'], 2)), list(groups(parts['faces'], 3)),
+                                           w=parts['w'], old=list(groups(parts['old'], 3)), lengths=parts['lengths'],
+                                           edgecolours=list(palette(parts['edgecolours'])), facecolours=list(palette(parts['facecolours'])))
+
+
+# A list that only makes each item the first time it is asked for.
+# Used for the nodes, edges and faces of a memory mapped scene, so a scene with a million nodes doesn't make a
+# million objects just to be opened. Anything that changes the list (or loops through it) makes every item,
+# and from then on it is just a normal list
+class LazyList(MutableSequence):
+    def __init__(self, size, make):
+        self.size = size
+        self.make = make  # Function that makes the item at an index
+        self.made = {}    # Items made so far
+        self.items = None # The full list, once every item has been made
+
+    def fill(self):
+        if self.items is None:
+            self.items = [self[i] for i in range(self.size)]
+            self.made = None
+        return self.items
+
+    def __len__(self):
+        return self.size if self.items is None else len(self.items)
+
+    def __getitem__(self, i):
+        if self.items is not None:
+            return self.items[i]
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(self.size))]
+
+        i = operator.index(i) # Also takes numpy ints
+        if i < 0:
+            i += self.size
+        if not 0 <= i < self.size:
+            raise IndexError('list index out of range')
+        if i not in self.made:
+            self.made[i] = self.make(i)
+        return self.made[i]
+
+    def __setitem__(self, i, value):
+        self.fill()[i] = value
+
+    def __delitem__(self, i):
+        del self.fill()[i]
+
+    def insert(self, i, value):
+        self.fill().insert(i, value)
+
+    def __iter__(self):
+        return iter(self.fill())
+
+    # Saves (and copies) as a normal list
+    def __reduce__(self):
+        return list, (self.fill(),)
+
+    def __repr__(self):
+        return repr(self.fill())
+
+
+# Loads a scene by memory mapping the file instead of reading it.
+# The node and edge data is used straight from the mapped file, as the NodeBuffer of the wireframe (see ArrayEng.py),
+# and the nodes are VerletViews of that buffer, so the ArrayEngine can simulate it without copying anything.
+# The file is mapped copy on write: the file never changes, and only the parts that get moved are copied into memory.
+# Nodes, edges and faces are only made when something uses them. Needs numpy, and just loads normally without it
+def loadMapped(path):
+    if ArrayEng.np is None:
+        return load(path)
+    np = ArrayEng.np
+
+    with open(path, 'rb') as file:
+        data = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_COPY)
+    counts = header(data)
+    places, size = layout(*counts)
+    if len(data) < size:
+        raise ValueError('Scene file is cut short')
+
+    # Arrays that read straight from the mapped file
+    parts = {name: np.frombuffer(data, DTYPES[typecode], count, offset) for name, (offset, typecode, count) in places.items()}
+    nodes, edges, faces = counts
+    edgelist = parts['edges'].reshape(-1, 2)
+    facelist = parts['faces'].reshape(-1, 3)
+
+    wireframe = Wireframe.Wireframe()
+    wireframe.version += 1
+    buffer = ArrayEng.NodeBuffer.from_arrays(wireframe, parts['pos'].reshape(-1, 3), parts['old'].reshape(-1, 3),
+                                             parts['w'], edgelist, parts['lengths'])
+    wireframe.buffer = buffer
+
+    def colour(values, i):
+        return tuple(round(float(value), 2) for value in values[i * 3:i * 3 + 3])
+
+    def node(i):
+        return ArrayEng.VerletView(buffer, i)
+
+    def edge(i):
+        first, second = edgelist[i]
+        return Wireframe.Stick(wireframe.nodes[first], wireframe.nodes[second], colour(parts['edgecolours'], i), float(parts['lengths'][i]))
+
+    def face(i):
+        first, second, third = facelist[i]
+        return Wireframe.Face(wireframe.nodes[first], wireframe.nodes[second], wireframe.nodes[third], colour(parts['facecolours'], i))
+
+    wireframe.nodes = LazyList(nodes, node)
+    wireframe.edges = LazyList(edges, edge)
+    wireframe.faces = LazyList(faces, face)
+    return wireframe
+
+
+# Saves a wireframe to a scene file.
+# The scene is written to a file next to it, which is then moved over the old one. Writing straight over the old file
+# would cut it short while a scene memory mapped from it (see loadMapped) is still reading it, which crashes the game.
+# Moving a file over it leaves the old one for the mapped scene to keep using
+def save(wireframe, path):
+    data = pack(wireframe)
+    temp = path + '.tmp'
+    try:
+        with open(temp, 'wb') as file:
+            file.write(data)
+        if os.path.exists(path):
+            shutil.copymode(path, temp)
+        os.replace(temp, path)
+    except BaseException:
+        if os.path.exists(temp):
+            os.remove(temp)
+        raise
+
+
+# Loads a wireframe from a scene file. Never unpickles anything, so old pickled scenes raise a ValueError
+def load(path):
+    with open(path, 'rb') as file:
+        return unpack(file.read())
+
+
+# Returns whether a file is a scene file
+def isScene(path):
+    with open(path, 'rb') as file:
+        return file.read(len(MAGIC)) == MAGIC
+
+
+# Turns an old pickled scene file into a scene file. Only use this on files you trust, as it unpickles them.
+# Overwrites the old file if no output is given
+def convert(path, output=None):
+    if isScene(path):
+        wireframe = load(path)
+    else:
+        with open(path, 'rb') as file:
+            wireframe = pickle.load(file)
+    save(wireframe, output or path)
+    return wireframe
+
+
+if __name__ == '__main__':
+    for path in sys.argv[1:]:
+        convert(path)
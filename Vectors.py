@@ -1,13 +1,14 @@
 import math
-from copy import deepcopy
 
 # Defines the vector classes
+# They use __slots__ instead of a dictionary for their values, as a big scene has a lot of them.
+# This makes them a lot smaller, and a bit quicker to use
 class Vector3d:
+    __slots__ = ('x', 'y', 'z')
+
     def __init__(self, *x):
         assert len(x)==3, "Unexpected arguments"
-        self.x = x[0]
-        self.y = x[1]
-        self.z = x[2]
+        self.x, self.y, self.z = x
 
     def length(self):
         return math.sqrt(self.x ** 2 + self.y ** 2 + self.z ** 2)
@@ -47,6 +48,22 @@ class Vector3d:
         self.y -= vect.y
         self.z -= vect.z
 
+    # The same as .add(vect * scalar) and .sub(vect * scalar), without making a new vector
+    def addScaled(self, vect, scalar):
+        self.x += vect.x * scalar
+        self.y += vect.y * scalar
+        self.z += vect.z * scalar
+
+    def subScaled(self, vect, scalar):
+        self.x -= vect.x * scalar
+        self.y -= vect.y * scalar
+        self.z -= vect.z * scalar
+
+    def set(self, x, y, z):
+        self.x = x
+        self.y = y
+        self.z = z
+
     def __mul__(self, scalar):
         if isinstance(scalar, Vector3d):
             return Vector3d(self.x * scalar.x, self.y * scalar.y, self.z * scalar.z)
@@ -94,7 +111,7 @@ class Vector3d:
         return temp
 
     def copy(self):
-        return deepcopy(self)
+        return Vector3d(self.x, self.y, self.z)
 
     def tuple(self):
         return eval(self.__str__())
@@ -116,7 +133,18 @@ class Vector3d:
     def __ne__(self, vect):
         return not self.__eq__(vect)
 
+    # Saved as just the three numbers
+    def __reduce__(self):
+        return Vector3d, (self.x, self.y, self.z)
+
+    # Loads vectors pickled before they had slots (they were saved as a dictionary of values)
+    def __setstate__(self, state):
+        for name, value in state.items():
+            setattr(self, name, value)
+
 class Vector2d:
+    __slots__ = ('x', 'y')
+
     def __init__(self, *x):
         assert len(x)==2, "Unexpected arguments"
         self.x = x[0]
@@ -131,7 +159,7 @@ class Vector2d:
         self.y /= length
 
     def copy(self):
-        return deepcopy(self)
+        return Vector2d(self.x, self.y)
 
     def __add__(self, vect):
         return Vector2d(self.x + vect.x, self.y + vect.y)
@@ -156,25 +184,119 @@ class Vector2d:
         # Are only compared with other distance methods that work in 3d. This is only 2d.
         return math.hypot(vect1.x - vect2.x, vect1.y - vect2.y)
 
+    def __reduce__(self):
+        return Vector2d, (self.x, self.y)
+
+    def __setstate__(self, state):
+        for name, value in state.items():
+            setattr(self, name, value)
+
+
+# The old position of a Verlet. Reads and writes straight from the Verlet's ox, oy and oz
+class OldPosition(Vector3d):
+    __slots__ = ('node',)
+
+    def __init__(self, node):
+        self.node = node
+
+    x = property(lambda self: self.node.ox, lambda self, value: setattr(self.node, 'ox', value))
+    y = property(lambda self: self.node.oy, lambda self, value: setattr(self.node, 'oy', value))
+    z = property(lambda self: self.node.oz, lambda self, value: setattr(self.node, 'oz', value))
+
 
 # Creates the Verlet Class, used in the physics engine
 # Recommended to read that first (PhysEng.py)
 class Verlet(Vector3d):
+    # The old position is stored as three numbers (ox, oy, oz) instead of another vector
+    __slots__ = ('w', 'ox', 'oy', 'oz')
+
     def __init__(self, *values):
         assert (len(values) in [4, 5] and values[3] in [1, 0]), "Unexpected arguments"
-        super(Verlet, self).__init__(*values[:3])
+        # Sets the position straight away instead of through Vector3d.__init__, as lots of these get made at once
+        self.x, self.y, self.z = values[:3]
 
         # w = 1 Means that the object will move normally
         # w = 0 Means that the object will be 'pinned' and only move if the user moves it.
         self.w = values[3]
 
         # Allows the old pos to be set manually, allowing for the node to have a defined starting velocity
-        try:
-            self.old = Vector3d(*values[4])
+        if len(values) == 5:
+            try:
+                self.ox, self.oy, self.oz = values[4]
+            except:
+                self.ox, self.oy, self.oz = values[:3]
 
         # Default. No starting velocity
-        except:
-            self.old = Vector3d(*values[:3])
+        else:
+            self.ox, self.oy, self.oz = values[:3]
+
+    # The old position as a vector. Changing it changes the Verlet
+    @property
+    def old(self):
+        return OldPosition(self)
+
+    @old.setter
+    def old(self, vect):
+        self.ox, self.oy, self.oz = vect.x, vect.y, vect.z
+
+    def copy(self):
+        return Verlet(self.x, self.y, self.z, int(self.w), (self.ox, self.oy, self.oz))
+
+    # The maths the physics engine does on every node and edge, done in place so no vectors are made.
+    # They do the same sums in the same order as the vector version would, so the results are exactly the same
+
+    # Moves the node one step. Its velocity is how far it moved last step, times friction.
+    # Returns the squared length of that velocity
+    def integrate(self, friction, grav):
+        x, y, z = self.x, self.y, self.z
+        vx = (x - self.ox) * friction
+        vy = (y - self.oy) * friction
+        vz = (z - self.oz) * friction
+        self.ox, self.oy, self.oz = x, y, z
+
+        w = self.w
+        self.x = x + (vx + grav.x) * w
+        self.y = y + (vy + grav.y) * w
+        self.z = z + (vz + grav.z) * w
+        return vx ** 2 + vy ** 2 + vz ** 2
+
+    # Moves this node and another node so they are length apart. Pinned nodes don't move.
+    # Returns how far off the length was before moving, as a fraction of the length
+    def relax(self, other, length):
+        rx = self.x - other.x
+        ry = self.y - other.y
+        rz = self.z - other.z
+        distance = math.sqrt(rx ** 2 + ry ** 2 + rz ** 2)
+        difference = length - distance
+
+        # Nodes in the same spot can't be divided by, so they each move half the length
+        percent = difference / distance / 2 if distance else 0.5
+        rx *= percent
+        ry *= percent
+        rz *= percent
+
+        w = self.w
+        self.x += rx * w
+        self.y += ry * w
+        self.z += rz * w
+        w = other.w
+        other.x -= rx * w
+        other.y -= ry * w
+        other.z -= rz * w
+
+        # Edges with no length are off by however far apart their nodes are
+        return abs(difference) / length if length else distance
+
+    def __reduce__(self):
+        return Verlet, (self.x, self.y, self.z, self.w, (self.ox, self.oy, self.oz))
+
+    # Loads Verlets pickled before they had slots, where the old position was a vector
+    def __setstate__(self, state):
+        state = dict(state)
+        old = state.pop('old', None)
+        super().__setstate__(state)
+        if old is not None:
+            self.old = old
 
     def __str__(self):
         return '(%.2f, %.2f, %.2f)' % (self.x, self.y, self.z)
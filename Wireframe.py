@@ -1,4 +1,5 @@
 import Vectors
+import gc
 import copy
 import math
 import random
@@ -12,6 +13,21 @@ def wireDist(item, position):
                      (centre.z - position.z) ** 2)
 
 
+# Returns the position of a node as a tuple, so it can be used as a dictionary key
+def place(node):
+    return (node.x, node.y, node.z)
+
+
+# Returns what makes an edge the same as another edge: the positions of its start and end nodes
+def edgeKey(edge):
+    return (edge.first.x, edge.first.y, edge.first.z, edge.second.x, edge.second.y, edge.second.z)
+
+
+# Turns numpy arrays into lists, as going through lists is a lot faster than going through arrays one item at a time
+def plain(values):
+    return values.tolist() if hasattr(values, 'tolist') else values
+
+
 # The face class, one of the building blocks of a wireframe
 # It is a triangle that connects 3 nodes
 class Face:
@@ -21,8 +37,13 @@ class Face:
         self.second = second
         self.third  = third
 
-        # Uses a default colour if no colour is provided
-        self.colour = (random.randint(0, 255), random.randint(0, 255), random.randint(0, 255)) if not colour else colour.tuple()
+        # Uses a default colour if no colour is provided. The colour can be a vector or a tuple
+        if not colour:
+            self.colour = (random.randint(0, 255), random.randint(0, 255), random.randint(0, 255))
+        elif isinstance(colour, tuple):
+            self.colour = colour
+        else:
+            self.colour = colour.tuple()
 
     # Returns the distance between a face and a node
     # since this will only be used as a comparison, it doesnt sqrt the distance to save computing power
@@ -71,33 +92,117 @@ class Stick(Edge):
 
 # The wireframe object is an object that stores a collection of nodes, edges and faces
 class Wireframe:
+    # The version goes up every time the wireframe is changed, so things that are built from the wireframe
+    # (like the array buffer the ArrayEngine uses) know when they have to be rebuilt.
+    # These are class attributes so that wireframes pickled before they existed still load
+    version = 0
+    buffer = None
+    colouring = None
+    grouping = None
+    winding = None
+    lookup = None
+
     def __init__(self):
         self.nodes = []
         self.edges = []
         self.faces = []
 
+    # Builds a whole wireframe at once, without any of the checks addNodes, addEdges and addFaces do.
+    # positions is a list of (x, y, z), edges a list of (first, second) node indices and faces a list of
+    # (first, second, third) node indices. numpy arrays work too.
+    # The w values, old positions, edge lengths and colours of everything can also be given.
+    # Lengths that aren't given are worked out all at once. colour is used for every face, if facecolours isn't given
+    @classmethod
+    def from_arrays(cls, positions, edges=(), faces=(), w=None, old=None, lengths=None, edgecolours=None, facecolours=None, colour=False):
+        # Python's garbage collector keeps stopping to look through everything made so far when lots of objects
+        # are made at once. None of these objects can be garbage yet, so it is turned off until everything is made
+        collecting = gc.isenabled()
+        gc.disable()
+        try:
+            return cls.build(positions, edges, faces, w, old, lengths, edgecolours, facecolours, colour)
+        finally:
+            if collecting:
+                gc.enable()
+
+    @classmethod
+    def build(cls, positions, edges, faces, w, old, lengths, edgecolours, facecolours, colour):
+        positions, edges, faces = plain(positions), plain(edges), plain(faces)
+        wireframe = cls()
+
+        w = [1] * len(positions) if w is None else plain(w)
+        if old is None:
+            nodes = [Vectors.Verlet(x, y, z, int(weight)) for (x, y, z), weight in zip(positions, w)]
+        else:
+            nodes = [Vectors.Verlet(x, y, z, int(weight), last) for (x, y, z), weight, last in zip(positions, w, plain(old))]
+        wireframe.nodes = nodes
+
+        pairs = [(nodes[first], nodes[second]) for first, second in edges]
+        if lengths is None:
+            lengths = [math.sqrt((first.x - second.x) ** 2 + (first.y - second.y) ** 2 + (first.z - second.z) ** 2) for first, second in pairs]
+        else:
+            lengths = plain(lengths)
+        if edgecolours is None:
+            edgecolours = [False] * len(pairs)
+        wireframe.edges = [Stick(first, second, colour, length) for (first, second), length, colour in zip(pairs, lengths, edgecolours)]
+
+        if facecolours is None and not colour:
+            # Random colours like Face uses, but all made at once
+            values = iter(random.choices(range(256), k=len(faces) * 3))
+            facecolours = list(zip(values, values, values))
+        elif facecolours is None:
+            # Vectors are turned into a tuple once, instead of once for every face
+            facecolours = [colour if isinstance(colour, tuple) else colour.tuple()] * len(faces)
+        wireframe.faces = [Face(nodes[first], nodes[second], nodes[third], colour) for (first, second, third), colour in zip(faces, facecolours)]
+
+        wireframe.version += 1
+        return wireframe
+
+    # The wireframe keeps dictionaries of its nodes (by position), edges (by the positions of their nodes) and faces
+    # (by their text), so adding things doesn't have to look through everything already in the wireframe.
+    # They are [version, nodes, edges, faces], and are rebuilt from the lists if the wireframe was changed some other way.
+    # Positions are the ones nodes had when they were added. Wireframes that get built are never simulated
+    # (the engine moves copies), so they don't change
+    def lookups(self):
+        if self.lookup is None or self.lookup[0] != self.version:
+            nodes, edges, faces = {}, {}, {}
+            # The first node (or edge, or face) in the lists is kept, as that is the one the searches used to find
+            for node in self.nodes:
+                nodes.setdefault(place(node), node)
+            for edge in self.edges:
+                edges.setdefault(edgeKey(edge), edge)
+            for face in self.faces:
+                faces.setdefault(str(face), face)
+            self.lookup = [self.version, nodes, edges, faces]
+        return self.lookup
+
+    # Marks the wireframe as changed, and returns the lookups. Whatever is changing the wireframe keeps them up to date
+    def change(self):
+        lookup = self.lookups()
+        self.version += 1
+        lookup[0] = self.version
+        return lookup
+
     def addNodes(self, *nodes):
+        version, positions, edges, faces = self.change()
+
         # Goes through each node passed to the function
         for node in nodes:
             assert isinstance(node, Vectors.Vector3d), "must be Vector"\
 
             # Makes sure that there is not a node already in the position of the new node.
-            if not any((node.x, node.y, node.z) == (point.x, point.y, point.z) for point in self.nodes):
+            if place(node) not in positions:
+                positions[place(node)] = node
                 self.nodes.append(node)
 
     def addEdges(self, *edgelist, **kwargs):
         # Checks to see if an index argument was passed.
         # If index == True the edge's start and end nodes are retrieved by indexing the wireframe node list.
-        # If index == False the edge's start and end nodes are retrieved by looking through the wireframe node list, and finding a node at a certain position
+        # If index == False the edge's start and end nodes are retrieved by finding a node in the wireframe at a certain position
+        version, positions, edges, faces = self.change()
         if 'index' in kwargs and kwargs['index'] == False:
             for edge in edgelist:
-                finals = []
-                for ideal in edge:
-                    # Searches for a node in the same position as one of the nodes in the edge (the variable)
-                    for node in self.nodes:
-                        if (ideal.x, ideal.y, ideal.z) == (node.x, node.y, node.z):
-                            finals.append(node)
-                            break
+                # Finds the nodes in the same position as the nodes in the edge (the variable)
+                finals = [positions[place(ideal)] for ideal in edge if place(ideal) in positions]
 
                 # Tries to see if it's possible to build the edge
                 try:
@@ -106,48 +211,44 @@ class Wireframe:
                     return
 
                 # If it's possible to build the edge, it only adds it to the wireframe object if an edge like it does not already exist
-                if not any((stick.first.x, stick.first.y, stick.first.z, stick.second.x, stick.second.y, stick.second.z) ==
-                        (otherstick.first.x, otherstick.first.y, otherstick.first.z, otherstick.second.x, otherstick.second.y, otherstick.second.z)
-                           for otherstick in self.edges):
+                if edgeKey(stick) not in edges:
+                    edges[edgeKey(stick)] = stick
                     self.edges.append(stick)
         else:
             # Creates an Edge using indicies from the edge (variable)
             for edge in edgelist:
                 stick = Stick(self.nodes[edge[0]], self.nodes[edge[1]])
                 # Makes sure the edge doesn't already exist
-                if not any((stick.first.x, stick.first.y, stick.first.z, stick.second.x, stick.second.y,
-                            stick.second.z) ==
-                                   (otherstick.first.x, otherstick.first.y, otherstick.first.z, otherstick.second.x,
-                                    otherstick.second.y, otherstick.second.z)
-                           for otherstick in self.edges):
+                if edgeKey(stick) not in edges:
+                    edges[edgeKey(stick)] = stick
                     self.edges.append(stick)
 
     # Creates a face, using the same process as the edge, except with the face taking 3 variables
     def addFaces(self, *facelist, **kwargs):
+        version, positions, edges, faces = self.change()
         if 'index' in kwargs and kwargs['index'] == False:
             for face in facelist:
-                finals = []
-                for ideal in face:
-                    for node in self.nodes:
-                        if (ideal.x, ideal.y, ideal.z) == (node.x, node.y, node.z):
-                            finals.append(node)
-                            break
+                finals = [positions[place(ideal)] for ideal in face if place(ideal) in positions]
                 try:
                     if 'colour' in kwargs:
                         face = Face(*finals, colour=kwargs['colour'].copy())
                     else:
                         face = Face(*finals)
                 except:
-                    pass
+                    # Skips faces that have nodes that aren't in the wireframe
+                    continue
 
-                if not any(face.__str__() == builtface.__str__() for builtface in self.faces):
+                if str(face) not in faces:
+                    faces[str(face)] = face
                     self.faces.append(face)
         else:
             for face in facelist:
                 if 'colour' in kwargs:
-                    self.faces.append(Face(self.nodes[face[0]], self.nodes[face[1]], self.nodes[face[2]], colour=kwargs['colour'].copy()))
+                    face = Face(self.nodes[face[0]], self.nodes[face[1]], self.nodes[face[2]], colour=kwargs['colour'].copy())
                 else:
-                    self.faces.append(Face(self.nodes[face[0]], self.nodes[face[1]], self.nodes[face[2]]))
+                    face = Face(self.nodes[face[0]], self.nodes[face[1]], self.nodes[face[2]])
+                faces.setdefault(str(face), face)
+                self.faces.append(face)
 
     # Returns a rough approximation of the centre of the wireframe
     def findCentre(self):
@@ -156,20 +257,217 @@ class Wireframe:
         meanZ = sum([node.z for node in self.nodes]) / len(self.nodes)
         return Vectors.Vector3d(meanX, meanY, meanZ)
 
-    # Returns a new copy of the wireframe
-    # Deepcopies so it does not return a reference to its self
+    # Splits the edges into colour groups, where no two edges in a group share a node.
+    # Edges in the same group don't affect each other, so the engine can solve a whole group at once.
+    # Returns a list of groups, each being a list of indices into self.edges.
+    # The groups are only worked out again if the wireframe has changed
+    def colourEdges(self):
+        return self.colours()[1]
+
+    # Returns the edges one colour group after another, which is the order the engine solves them in with the colour solver.
+    # Kept with the colour groups, so it is only made again when they are
+    def colourOrder(self):
+        return self.colours()[2]
+
+    def colours(self):
+        if self.colouring is None or self.colouring[0] != self.version:
+            groups = []
+            used = {} # The colours already touching each node
+            for i, edge in enumerate(self.edges):
+                taken = used.setdefault(id(edge.first), set()) | used.setdefault(id(edge.second), set())
+
+                # Gives the edge the lowest colour neither of its nodes has yet
+                colour = 0
+                while colour in taken:
+                    colour += 1
+                if colour == len(groups):
+                    groups.append([])
+                groups[colour].append(i)
+                used[id(edge.first)].add(colour)
+                used[id(edge.second)].add(colour)
+
+            self.colouring = (self.version, groups, [self.edges[i] for group in groups for i in group])
+        return self.colouring
+
+    # Splits the nodes into islands. An island is a group of nodes that are connected to each other by edges
+    # Returns a list of islands, each being a list of indices into self.nodes.
+    # Like the edge colouring, the islands are only worked out again if the wireframe has changed
+    def islands(self):
+        if self.grouping is None or self.grouping[0] != self.version:
+            index = {id(node): i for i, node in enumerate(self.nodes)}
+
+            # Union find. Every node points towards another node in its island, until reaching the root node
+            parent = list(range(len(self.nodes)))
+            def root(i):
+                while parent[i] != i:
+                    parent[i] = parent[parent[i]]
+                    i = parent[i]
+                return i
+
+            for edge in self.edges:
+                parent[root(index[id(edge.first)])] = root(index[id(edge.second)])
+
+            groups = {}
+            for i in range(len(self.nodes)):
+                groups.setdefault(root(i), []).append(i)
+
+            self.grouping = (self.version, list(groups.values()))
+        return self.grouping[1]
+
+    # Works out which way round each face has to be read for every face to point out of the wireframe.
+    # Only works if the faces make a closed surface: every side of every face is shared with exactly one other face.
+    # Returns 1 for each face whose nodes already go round the right way and -1 for each face that has to be flipped,
+    # or None if the faces don't make a closed surface (a flat cloth, or a box with a side missing).
+    # Faces next to each other have to go along the side they share in opposite directions, so the direction of one
+    # face decides the direction of every face it is joined to. Which way is out is then picked so the volume is positive.
+    # Like the islands, the windings are only worked out again if the wireframe has changed
+    def windings(self):
+        if self.winding is None or self.winding[0] != self.version:
+            self.winding = (self.version, self.orient())
+        return self.winding[1]
+
+    def orient(self):
+        index = {id(node): i for i, node in enumerate(self.nodes)}
+        try:
+            faces = [(index[id(face.first)], index[id(face.second)], index[id(face.third)]) for face in self.faces]
+        except KeyError:
+            return None
+        if not faces or any(len(set(face)) < 3 for face in faces):
+            return None
+
+        # The faces on each side, and which way each face goes along it
+        sides = {}
+        for i, (first, second, third) in enumerate(faces):
+            for start, end in ((first, second), (second, third), (third, first)):
+                sides.setdefault(frozenset((start, end)), []).append((i, start))
+        if any(len(shared) != 2 for shared in sides.values()):
+            return None
+
+        signs = [0] * len(faces)
+        positions = [(node.x, node.y, node.z) for node in self.nodes]
+        for first in range(len(faces)):
+            if signs[first]:
+                continue
+
+            # Goes through every face joined to this one, turning each the same way as the face next to it
+            signs[first] = 1
+            stack, joined = [first], [first]
+            while stack:
+                i = stack.pop()
+                a, b, c = faces[i]
+                for start, end in ((a, b), (b, c), (c, a)):
+                    (j, other), = [(j, other) for j, other in sides[frozenset((start, end))] if j != i]
+                    sign = -signs[i] if other == start else signs[i]
+                    if not signs[j]:
+                        signs[j] = sign
+                        stack.append(j)
+                        joined.append(j)
+                    elif signs[j] != sign:
+                        # A surface like a mobius strip, which has no inside or outside
+                        return None
+
+            # Six times the volume inside this surface. It is negative if the faces are pointing in
+            volume = 0
+            for i in joined:
+                (ax, ay, az), (bx, by, bz), (cx, cy, cz) = [positions[node] for node in faces[i]]
+                volume += signs[i] * (ax * (by * cz - bz * cy) + ay * (bz * cx - bx * cz) + az * (bx * cy - by * cx))
+            if volume < 0:
+                for i in joined:
+                    signs[i] = -signs[i]
+        return signs
+
+    # Returns a new copy of the wireframe, that doesn't share any nodes with it
+    # Instead of deepcopying, the nodes are copied into lists and the edges and faces are rebuilt from node indices
     def copy(self):
-        return copy.deepcopy(self)
+        nodes = self.nodes
+        index = {id(node): i for i, node in enumerate(nodes)}
+        try:
+            # Nodes that aren't Verlets (like the plain vectors of the box frame) would come back as Verlets
+            if not all(isinstance(node, Vectors.Verlet) for node in nodes):
+                raise TypeError
+            edges = [(index[id(edge.first)], index[id(edge.second)]) for edge in self.edges]
+            faces = [(index[id(face.first)], index[id(face.second)], index[id(face.third)]) for face in self.faces]
+            lengths = [edge.length for edge in self.edges]
+            w = [node.w for node in nodes]
+            old = [(node.ox, node.oy, node.oz) for node in nodes]
+        except (KeyError, AttributeError, TypeError):
+            # Edges or faces joined to nodes that aren't in the wireframe, edges that aren't sticks, or nodes that aren't Verlets.
+            # Only deepcopy can copy those
+            return copy.deepcopy(self)
+
+        return type(self).from_arrays([(node.x, node.y, node.z) for node in nodes], edges, faces, w=w, old=old,
+                                      lengths=lengths, edgecolours=[edge.colour for edge in self.edges],
+                                      facecolours=[face.colour for face in self.faces])
 
     # Deletes all data in the wireframe
     def clear(self):
+        self.version += 1
         del self.nodes[:]
         del self.edges[:]
         del self.faces[:]
 
+    # The array buffer, edge colouring, islands, windings and lookups are never saved or copied. They get rebuilt by whatever needs them
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state.pop('buffer', None)
+        state.pop('colouring', None)
+        state.pop('grouping', None)
+        state.pop('winding', None)
+        state.pop('lookup', None)
+        return state
+
     def __iter__(self):
         for node in self.nodes:
             yield node
 
     def __str__(self):
-        return '\n'.join(self)
\ No newline at end of file
+        return '\n'.join(self)
+
+
+# Functions that make wireframes, used to test how the engine copes with big wireframes
+
+# A sheet of columns x rows nodes, with spacing between each node, hanging down from its top row of pinned nodes.
+# The node at column i and row j is nodes[i * rows + j]
+def cloth(columns, rows, spacing, origin=Vectors.Vector3d(0, 0, 0), colour=(255, 255, 255)):
+    positions = [(origin.x + i * spacing, origin.y + j * spacing, origin.z) for i in range(columns) for j in range(rows)]
+    w = [0 if j == 0 else 1 for i in range(columns) for j in range(rows)]
+
+    edges = []
+    faces = []
+    for i in range(columns):
+        for j in range(rows):
+            node = i * rows + j
+            if i + 1 < columns:
+                edges.append((node, node + rows))
+            if j + 1 < rows:
+                edges.append((node, node + 1))
+            if i + 1 < columns and j + 1 < rows:
+                faces.append((node, node + rows, node + 1))
+                faces.append((node + rows, node + rows + 1, node + 1))
+    return Wireframe.from_arrays(positions, edges, faces, w=w, colour=colour)
+
+
+# A line of nodes going along the x axis, hanging from its first node
+def rope(nodes, spacing, origin=Vectors.Vector3d(0, 0, 0)):
+    positions = [(origin.x + i * spacing, origin.y, origin.z) for i in range(nodes)]
+    w = [0] + [1] * (nodes - 1)
+    return Wireframe.from_arrays(positions, [(i, i + 1) for i in range(nodes - 1)], w=w)
+
+
+# A block of x * y * z nodes, with every node joined to the nodes next to it along each axis.
+# The node at (i, j, k) is nodes[(i * y + j) * z + k]
+def lattice(x, y, z, spacing, origin=Vectors.Vector3d(0, 0, 0)):
+    positions = [(origin.x + i * spacing, origin.y + j * spacing, origin.z + k * spacing) for i in range(x) for j in range(y) for k in range(z)]
+
+    edges = []
+    for i in range(x):
+        for j in range(y):
+            for k in range(z):
+                node = (i * y + j) * z + k
+                if i + 1 < x:
+                    edges.append((node, node + y * z))
+                if j + 1 < y:
+                    edges.append((node, node + z))
+                if k + 1 < z:
+                    edges.append((node, node + 1))
+    return Wireframe.from_arrays(positions, edges)
@@ -7,15 +7,20 @@ import pygame
 
 # This file holds a lot of the objects related to the GUI of the game
 
-pygame.mixer.pre_init(44100, -16, 1, 512)
-pygame.init()
+# The font used for all text. Created the first time text is drawn (see getFont)
+font = False
 
-pygame.font.init()
-font = pygame.font.Font(None, 36)
+def getFont():
+    global font
+    if not font:
+        Constants.initPygame()
+        pygame.font.init()
+        font = pygame.font.Font(None, 36)
+    return font
 
 # This function draws text in the middle of a rect
 def drawtext(surface, text, rect):
-    textsurf = font.render(text, False, (255, 255, 255))
+    textsurf = getFont().render(text, False, (255, 255, 255))
     # Gets the dimensions of the text
     values = getDimensions(text)
 
@@ -25,7 +30,7 @@ def drawtext(surface, text, rect):
 # Returns the width and height of a surface made created from text
 def getDimensions(text):
     # Turns the text into a surface
-    textsurf = font.render(text, False, (255, 255, 255))
+    textsurf = getFont().render(text, False, (255, 255, 255))
     # Returns the width and height of that surface
     return textsurf.get_size()
 
@@ -52,6 +57,8 @@ class Rect:
 # Creates the input box. Gets input from a user, then when they press enter,
 # Executes the callback function with the text the user entered
 class InputBox(Rect):
+    events = (MouseClick, KeyEvent, TickEvent, RenderEvent)
+
     @EventAdder
     def __init__(self, x, y, w, h, colour, func, prompt, display, **kwargs):
         super().__init__(x, y, w, h)
@@ -128,6 +135,8 @@ class InputBox(Rect):
 # Creates a coloured box
 # Like a rect, but draws itself every frame and blocks mouse clicks
 class ColouredBox(Rect):
+    events = (MouseClick, RenderEvent)
+
     @EventAdder
     def __init__(self, x, y, w, h, colour, display, **kwargs):
         super().__init__(x, y, w, h)
@@ -149,6 +158,8 @@ class ColouredBox(Rect):
 
 # A text box. Like a normal box but displays text
 class TextBoxEvent(Rect):
+    events = (MouseClick, RenderEvent)
+
     @EventAdder
     def __init__(self, x, y, w, h, text, surface, **kwargs):
         super().__init__(x, y, w, h)
@@ -189,6 +200,8 @@ class TextBoxEvent(Rect):
 
 
 class Button(Rect):
+    events = (MouseClick, TickEvent, RenderEvent)
+
     @EventAdder
     def __init__(self, text, func, display, hover = 1.1, **kwargs):
         # Allows the user to build the button from a rect or from a position
@@ -249,6 +262,8 @@ class Button(Rect):
 # Creates a slider that can be moved up and down.
 # Executes a callback function continually when the slider is being held
 class Scroller(Rect):
+    events = (MouseClick, TickEvent, RenderEvent)
+
     @EventAdder
     def __init__(self, x, y, h, values, func, display, **kwargs):
         super().__init__(x, y, 1, h)